@@ -0,0 +1,23 @@
+-- Sargable doctor search (used by chatbot.get_doctors)
+-- ======================================================
+-- The chatbot used to filter on UPPER(...) / LEFT(...) expressions, which no
+-- index can serve. These stored generated columns hold the normalized values
+-- so the lookup becomes plain equality on indexed columns.
+
+ALTER TABLE specialty
+    ADD COLUMN specialty_name_norm VARCHAR(255)
+        GENERATED ALWAYS AS (UPPER(TRIM(specialty_name))) STORED;
+
+ALTER TABLE doctor
+    ADD COLUMN city_norm VARCHAR(255)
+        GENERATED ALWAYS AS (UPPER(TRIM(city))) STORED,
+    ADD COLUMN zip5 CHAR(5)
+        GENERATED ALWAYS AS (LEFT(TRIM(zip_code), 5)) STORED;
+
+CREATE INDEX idx_specialty_name_norm ON specialty (specialty_name_norm);
+
+-- InnoDB appends the primary key (doctor_id) to every secondary index, so
+-- within one (specialty, city) or (specialty, zip) group rows are already in
+-- doctor_id order: ORDER BY doctor_id + keyset paging needs no filesort.
+CREATE INDEX idx_doctor_specialty_city ON doctor (specialty_id, city_norm);
+CREATE INDEX idx_doctor_specialty_zip5 ON doctor (specialty_id, zip5);
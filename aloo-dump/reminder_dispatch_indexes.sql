@@ -0,0 +1,9 @@
+-- Reminder dispatcher window scans (used by reminder_dispatch.py)
+-- ======================================================
+-- The dispatcher reads all reminders in a time window across users, e.g.
+--   SELECT reminder_id FROM reminder WHERE remind_time >= ? AND remind_time < ?
+-- idx_reminder_user_time leads with user_id and cannot serve that. InnoDB
+-- stores the primary key (reminder_id) in every secondary index, so this one
+-- answers the periodic id-only reconcile without touching the table rows.
+
+CREATE INDEX idx_reminder_time ON reminder (remind_time);
@@ -0,0 +1,8 @@
+-- Month-window reminder lookup (used by app.reminders)
+-- ======================================================
+-- The calendar page asks for one user's reminders inside a single month:
+--   WHERE user_id = ? AND remind_time >= ? AND remind_time < ?
+-- With user_id leading and remind_time second, that is one index range scan
+-- already in remind_time order, so ORDER BY remind_time needs no filesort.
+
+CREATE INDEX idx_reminder_user_time ON reminder (user_id, remind_time);
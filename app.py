@@ -1,19 +1,39 @@
 from __future__ import annotations
 
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+import json
 import os
+import sys
+import threading
+import time
 import uuid
 import datetime
 import calendar
-
-from flask import Flask, jsonify, render_template, request, redirect, url_for, session
+from functools import lru_cache
+
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    render_template,
+    request,
+    redirect,
+    stream_with_context,
+    url_for,
+    session,
+)
 from dotenv import load_dotenv
-import mysql.connector
 
-# --- UPDATED IMPORT ---
-# We now import the full pipeline from chatbot.py instead of individual functions
-from chatbot import run_chat_pipeline
+import metrics
+import reminder_dispatch
+from dosing import expand_schedule, parse_frequency
+from db import get_connection, pool_stats
+
+# chatbot.py (and with it the ML model and Gemini) is imported lazily by the
+# /chatbot route or the warm-up thread, so other pages never pay for it.
+# refill_forecast.py (numpy) is likewise imported by the handlers that use it.
 
 app = Flask(__name__)
 
@@ -21,34 +41,90 @@ load_dotenv("config/api.env")
 
 app.secret_key = os.getenv("FLAS_SECRET_KEY", "dev-secret")
 
+# Preload the chat stack in the background right after startup (0 = load on first chat)
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "1") == "1"
+_chat_ready = threading.Event()
+# repr() of the exception if the warm-up failed; /ready reports it with a 503
+_chat_warmup_error: Optional[str] = None
 
-def get_db():
+# Longest range /reminders/generate will expand in one go
+SCHEDULE_MAX_DAYS = int(os.getenv("SCHEDULE_MAX_DAYS", "366"))
+# Rows per multi-row INSERT when writing a generated schedule
+SCHEDULE_INSERT_BATCH = int(os.getenv("SCHEDULE_INSERT_BATCH", "2000"))
+
+# Attach per-stage timings, DB and LLM counts to chat responses (always on under app.debug)
+CHAT_DEBUG_TIMINGS = os.getenv("CHAT_DEBUG_TIMINGS", "0") == "1"
+
+
+def _warm_up_chat() -> None:
+    global _chat_warmup_error
     try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            port=3306,
-            user="root",
-            password="[PASSWORD]",
-            database="[DATABASE_NAME]",
-        )
-        return conn
+        import chatbot
+        chatbot.warm_up()
     except Exception as e:
-        print("DB CONNECT ERROR:", repr(e))
-        raise
+        print("WARMUP ERROR:", repr(e))
+        _chat_warmup_error = repr(e)
+        return
+    _chat_ready.set()
+
+
+if WARMUP_ON_START:
+    threading.Thread(target=_warm_up_chat, name="chat-warmup", daemon=True).start()
+
+# Fire due reminders from this process (REMINDER_DISPATCH=1; see reminder_dispatch.py)
+if reminder_dispatch.REMINDER_DISPATCH:
+    reminder_dispatch.start()
+
+
+def get_db():
+    """
+    Request-scoped DB connection.
+    The first call in a request checks one connection out of the pool and
+    parks it on flask.g; later calls reuse it. close_db() returns it.
+    """
+    if "db" not in g:
+        try:
+            g.db = get_connection()
+        except Exception as e:
+            print("DB CONNECT ERROR:", repr(e))
+            raise
+    return g.db
+
+
+@app.teardown_appcontext
+def close_db(exc: Optional[BaseException] = None) -> None:
+    conn = g.pop("db", None)
+    if conn is not None:
+        conn.close()
 
 
 def get_current_user_id() -> str:
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT user_id FROM user LIMIT 1")
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    """
+    Resolve the demo user once per browser session.
+    Cached in g for the request and in the session cookie afterwards,
+    so only the very first request pays for the lookup query.
+    """
+    if "user_id" in g:
+        return g.user_id
+
+    user_id = session.get("user_id")
+    if not user_id:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("SELECT user_id FROM user LIMIT 1")
+        row = cur.fetchone()
+        cur.close()
+        # End the implicit read transaction so handlers can start_transaction()
+        conn.rollback()
 
-    if not row:
-        raise RuntimeError("No users in table")
-    
-    return row[0]
+        if not row:
+            raise RuntimeError("No users in table")
+
+        user_id = row[0]
+        session["user_id"] = user_id
+
+    g.user_id = user_id
+    return user_id
 
 
 # ---------------------------------------------------------------------
@@ -56,10 +132,41 @@ def get_current_user_id() -> str:
 # ---------------------------------------------------------------------
 
 
+def _invalidate_refill_forecast() -> None:
+    """Drop the cached forecast after a prescription write (nothing to drop if never imported)."""
+    module = sys.modules.get("refill_forecast")
+    invalidate = getattr(module, "invalidate_forecast", None)
+    if invalidate is not None:
+        invalidate()
+
+
 @app.route("/")
 def index() -> str:
     """Dashboard / homepage."""
-    return render_template("index.html", active_page="dashboard")
+    # Sliced from the cached whole-table forecast (refill_forecast.get_forecast)
+    try:
+        import refill_forecast
+        shortages = refill_forecast.shortages(refill_forecast.get_forecast(get_db()), get_current_user_id())
+    except Exception as e:
+        print("REFILL FORECAST ERROR:", repr(e))
+        shortages = []
+    return render_template("index.html", active_page="dashboard", shortages=shortages)
+
+
+@app.route("/refills/reminders", methods=["POST"])
+def create_refill_reminders():
+    """Add a Refill reminder for each of the user's upcoming shortages."""
+    conn = get_db()
+    try:
+        import refill_forecast
+        fc = refill_forecast.get_forecast(conn)
+        created = refill_forecast.create_refill_reminders(conn, refill_forecast.shortages(fc, get_current_user_id()))
+    except Exception as e:
+        print("REFILL REMINDERS ERROR:", repr(e))
+        created = []
+    for reminder_id in created:
+        reminder_dispatch.notify_created(reminder_id)
+    return redirect(url_for("reminders"))
 
 
 @app.route("/login")
@@ -104,8 +211,6 @@ def prescriptions() -> str:
     drugs = cur2.fetchall()
     cur2.close()
 
-    conn.close()
-
     # To update UI with the prescription count
     prescription_count = len(prescriptions)
 
@@ -140,7 +245,6 @@ def create_drug():
     )
     conn.commit()
     cur.close()
-    conn.close()
 
     return redirect(url_for("prescriptions"))
 
@@ -157,7 +261,6 @@ def delete_drug(drug_id: str):
         print("DRUG DELETE ERROR:", repr(e))
     finally:
         cur.close()
-        conn.close()
 
     return redirect(url_for("prescriptions"))
 
@@ -214,6 +317,7 @@ def create_prescription():
         session["prescription_count"] = total_prescriptions
 
         conn.commit()
+        _invalidate_refill_forecast()
 
     except Exception as e:
         conn.rollback()
@@ -221,7 +325,6 @@ def create_prescription():
     
     finally:
         cur.close()
-        conn.close()
 
     return redirect(url_for("prescriptions"))
 
@@ -249,7 +352,7 @@ def update_prescription(rx_id: str):
     )
     conn.commit()
     cur.close()
-    conn.close()
+    _invalidate_refill_forecast()
 
     return redirect(url_for("prescriptions"))
 
@@ -262,11 +365,23 @@ def delete_prescription(rx_id: str):
     cur.execute("DELETE FROM prescription WHERE rx_id = %s", (rx_id,))
     conn.commit()
     cur.close()
-    conn.close()
+    _invalidate_refill_forecast()
 
     return redirect(url_for("prescriptions"))
 
 
+@lru_cache(maxsize=64)
+def _month_skeleton(year: int, month: int) -> tuple:
+    """Sunday-first weeks of (day, "YYYY-MM-DD") cells; (0, None) pads the edges."""
+    start_col = (datetime.date(year, month, 1).weekday() + 1) % 7
+    _, days_in_month = calendar.monthrange(year, month)
+
+    cells = [(0, None)] * start_col
+    cells += [(day, f"{year:04d}-{month:02d}-{day:02d}") for day in range(1, days_in_month + 1)]
+    cells += [(0, None)] * (-len(cells) % 7)
+    return tuple(tuple(cells[i:i + 7]) for i in range(0, len(cells), 7))
+
+
 @app.route("/reminders", methods=["GET"])
 def reminders() -> str:
     """List reminders with a monthly calendar view."""
@@ -274,6 +389,32 @@ def reminders() -> str:
 
     current_user_id = get_current_user_id()
 
+    # Calendar Setup
+    today = datetime.date.today()
+    try:
+        month = int(request.args.get("month", today.month))
+        year = int(request.args.get("year", today.year))
+    except (ValueError, TypeError):
+        month, year = today.month, today.year
+    if not (1 <= month <= 12 and datetime.MINYEAR < year < datetime.MAXYEAR):
+        month, year = today.month, today.year
+
+    # Navigation links
+    if month == 1:
+        prev_m, prev_y = 12, year - 1
+    else:
+        prev_m, prev_y = month - 1, year
+
+    if month == 12:
+        next_m, next_y = 1, year + 1
+    else:
+        next_m, next_y = month + 1, year
+
+    # Only the visible month; a half-open range on remind_time lets
+    # idx_reminder_user_time (aloo-dump/reminder_indexes.sql) serve it
+    month_start = datetime.datetime(year, month, 1)
+    month_end = datetime.datetime(next_y, next_m, 1)
+
     # Get reminders joined with drug info
     cur = conn.cursor(dictionary=True)
     cur.execute(
@@ -284,9 +425,10 @@ def reminders() -> str:
         JOIN prescription p ON r.rx_id = p.rx_id
         JOIN drug d ON p.drug_id = d.drug_id
         WHERE r.user_id = %s
+          AND r.remind_time >= %s AND r.remind_time < %s
         ORDER BY r.remind_time ASC
         """,
-        (current_user_id,),
+        (current_user_id, month_start, month_end),
     )
     reminders_data = cur.fetchall()
     cur.close()
@@ -305,59 +447,20 @@ def reminders() -> str:
     )
     user_prescriptions = cur2.fetchall()
     cur2.close()
-    conn.close()
 
-    # Calendar Setup
-    today = datetime.date.today()
-    try:
-        month = int(request.args.get("month", today.month))
-        year = int(request.args.get("year", today.year))
-    except (ValueError, TypeError):
-        month, year = today.month, today.year
-
-    # Navigation links
-    if month == 1:
-        prev_m, prev_y = 12, year - 1
-    else:
-        prev_m, prev_y = month - 1, year
-
-    if month == 12:
-        next_m, next_y = 1, year + 1
-    else:
-        next_m, next_y = month + 1, year
-
-    # Map reminders for O(1) lookup during grid construction
-    reminders_map = {}
+    # Every row is inside the month, so the day number is enough as a key
+    reminders_by_day: Dict[int, List[Dict[str, Any]]] = {}
     for r in reminders_data:
-        if r["remind_time"]:
-            d_str = r["remind_time"].strftime("%Y-%m-%d")
-            reminders_map.setdefault(d_str, []).append(r)
-
-    # Build the calendar grid
-    start_weekday = datetime.date(year, month, 1).weekday()
-    start_col = (start_weekday + 1) % 7
-    _, days_in_month = calendar.monthrange(year, month)
+        reminders_by_day.setdefault(r["remind_time"].day, []).append(r)
 
-    calendar_weeks = []
-    current_week = [None] * start_col 
-
-    for day in range(1, days_in_month + 1):
-        d_str = datetime.date(year, month, day).strftime("%Y-%m-%d")
-        
-        current_week.append({
-            "day": day,
-            "date_str": d_str,
-            "reminders": reminders_map.get(d_str, [])
-        })
-
-        if len(current_week) == 7:
-            calendar_weeks.append(current_week)
-            current_week = []
-
-    if current_week:
-        while len(current_week) < 7:
-            current_week.append(None)
-        calendar_weeks.append(current_week)
+    calendar_weeks = [
+        [
+            {"day": day, "date_str": date_str, "reminders": reminders_by_day.get(day, [])}
+            if day else None
+            for day, date_str in week
+        ]
+        for week in _month_skeleton(year, month)
+    ]
 
     return render_template(
         "reminders.html",
@@ -387,6 +490,7 @@ def create_reminder():
         date_str = datetime.date.today().strftime("%Y-%m-%d")
     
     full_ts = f"{date_str} {time_str}:00"
+    reminder_id = str(uuid.uuid4())
     
     conn = get_db()
     cur = conn.cursor()
@@ -395,15 +499,102 @@ def create_reminder():
         INSERT INTO reminder (reminder_id, user_id, rx_id, remind_time)
         VALUES (%s, %s, %s, %s)
         """,
-        (str(uuid.uuid4()), current_user_id, rx_id, full_ts),
+        (reminder_id, current_user_id, rx_id, full_ts),
     )
     conn.commit()
     cur.close()
-    conn.close()
+    reminder_dispatch.notify_created(reminder_id)
 
     return redirect(url_for("reminders"))
 
 
+@app.route("/reminders/generate", methods=["POST"])
+def generate_reminders():
+    """
+    Expand prescription frequencies into reminder rows over a date range.
+    override_frequency (optional) replaces each prescription's own frequency
+    and is stored on the rows. Slots that already have a reminder for the
+    same prescription are skipped, so re-running is harmless. Everything is
+    written in one transaction with executemany, which mysql.connector
+    sends as a single multi-row INSERT per batch.
+    """
+    rx_ids = [rx_id for rx_id in request.form.getlist("rx_id") if rx_id]
+    override = (request.form.get("override_frequency") or "").strip() or None
+    try:
+        start = datetime.date.fromisoformat(request.form.get("start_date") or "")
+    except ValueError:
+        start = datetime.date.today()
+    try:
+        days = min(max(int(request.form.get("days", 30)), 1), SCHEDULE_MAX_DAYS)
+    except (ValueError, TypeError):
+        days = 30
+
+    override_freq = parse_frequency(override) if override else None
+    if override and override_freq is None:
+        print("GENERATE REMINDERS: unrecognized override frequency", repr(override))
+        return redirect(url_for("reminders", month=start.month, year=start.year))
+
+    current_user_id = get_current_user_id()
+    conn = get_db()
+    cur = conn.cursor()
+    new_ids: List[str] = []
+    try:
+        conn.start_transaction(isolation_level="READ COMMITTED")
+
+        where, params = "p.user_id = %s", [current_user_id]
+        if rx_ids:
+            where += f" AND p.rx_id IN ({', '.join(['%s'] * len(rx_ids))})"
+            params += rx_ids
+        cur.execute(f"SELECT p.rx_id, p.frequency FROM prescription p WHERE {where}", params)
+        prescriptions = cur.fetchall()
+
+        range_start = datetime.datetime.combine(start, datetime.time.min)
+        range_end = range_start + datetime.timedelta(days=days)
+        cur.execute(
+            """
+            SELECT rx_id, remind_time FROM reminder
+            WHERE user_id = %s AND remind_time >= %s AND remind_time < %s
+            """,
+            (current_user_id, range_start, range_end),
+        )
+        existing = set(cur.fetchall())
+
+        rows = []
+        for rx_id, frequency in prescriptions:
+            freq = override_freq or parse_frequency(frequency)
+            if freq is None:
+                print("GENERATE REMINDERS: skipping unrecognized frequency", repr(frequency), "for", rx_id)
+                continue
+            for remind_time in expand_schedule(freq, start, days):
+                if (rx_id, remind_time) not in existing:
+                    reminder_id = str(uuid.uuid4())
+                    new_ids.append(reminder_id)
+                    rows.append((reminder_id, current_user_id, rx_id, remind_time, override))
+
+        for i in range(0, len(rows), SCHEDULE_INSERT_BATCH):
+            cur.executemany(
+                """
+                INSERT INTO reminder (reminder_id, user_id, rx_id, remind_time, override_frequency)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                rows[i:i + SCHEDULE_INSERT_BATCH],
+            )
+        conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        new_ids = []
+        print("GENERATE REMINDERS ERROR:", repr(e))
+
+    finally:
+        cur.close()
+
+    for reminder_id in new_ids:
+        reminder_dispatch.notify_created(reminder_id)
+
+    return redirect(url_for("reminders", month=start.month, year=start.year))
+
+
 @app.route("/reminders/<reminder_id>/delete", methods=["POST"])
 def delete_reminder(reminder_id: str):
     conn = get_db()
@@ -411,7 +602,7 @@ def delete_reminder(reminder_id: str):
     cur.execute("DELETE FROM reminder WHERE reminder_id = %s", (reminder_id,))
     conn.commit()
     cur.close()
-    conn.close()
+    reminder_dispatch.notify_deleted(reminder_id)
 
     return redirect(url_for("reminders"))
 
@@ -421,6 +612,80 @@ def settings() -> str:
     return render_template("settings.html", active_page="settings")
 
 
+@app.route("/ready")
+def ready() -> Any:
+    """Readiness probe: 503 until the chat stack has been warmed up, or if that failed."""
+    if _chat_warmup_error is not None:
+        return jsonify({"ready": False, "chat_warm": False, "error": _chat_warmup_error}), 503
+    chat_ready = _chat_ready.is_set() or not WARMUP_ON_START
+    return jsonify({"ready": chat_ready, "chat_warm": _chat_ready.is_set()}), (200 if chat_ready else 503)
+
+
+@app.route("/metrics")
+def metrics_endpoint() -> Any:
+    """Prometheus scrape target: stage/DB/LLM latencies plus pool and cache gauges."""
+    gauges: Dict[str, Any] = {
+        "medibuddy_db_pool": (
+            "Connection pool state (see db.ConnectionPool.stats).",
+            {f'stat="{k}"': v for k, v in pool_stats().items()},
+        ),
+        "medibuddy_chat_warm": ("1 once the chat stack is loaded.", {"": int(_chat_ready.is_set())}),
+    }
+    # Only report chat-side state if something already imported it. The warm-up
+    # thread may still be mid-import, so skip whatever isn't defined yet.
+    chatbot_module = sys.modules.get("chatbot")
+    symptom_cache = getattr(chatbot_module, "SYMPTOM_CACHE", None)
+    if symptom_cache is not None:
+        gauges["medibuddy_symptom_cache"] = (
+            "Symptom extraction cache (see llm_cache.ResponseCache.stats).",
+            {f'stat="{k}"': v for k, v in symptom_cache.stats().items()},
+        )
+    gemini = getattr(chatbot_module, "GEMINI", None)
+    if gemini is not None:
+        gauges["medibuddy_llm_client"] = (
+            "Gemini client circuit breaker (see llm_client.GeminiClient.stats).",
+            {f'stat="{k}"': v for k, v in gemini.stats().items()},
+        )
+    scheduler = reminder_dispatch.get_scheduler()
+    if scheduler is not None:
+        gauges["medibuddy_reminder_dispatch"] = (
+            "Reminder dispatcher state (see reminder_dispatch.ReminderScheduler.stats).",
+            {f'stat="{k}"': v for k, v in scheduler.stats().items()},
+        )
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+def _chat_timings_enabled() -> bool:
+    return CHAT_DEBUG_TIMINGS or app.debug
+
+
+def _finish_trace(trace: Dict[str, Any], started: float) -> Dict[str, Any]:
+    trace["total_seconds"] = round(time.perf_counter() - started, 6)
+    return trace
+
+
+@app.route("/chatbot/doctors", methods=["GET"])
+def chatbot_doctors() -> Any:
+    """Next page of recommended doctors (keyset cursor from the previous page)."""
+    specialty = (request.args.get("specialty") or "").strip()
+    if not specialty:
+        return jsonify({"error": "Missing specialty"}), 400
+
+    from chatbot import get_doctors
+
+    try:
+        page = get_doctors(
+            specialty,
+            city=(request.args.get("city") or "").strip() or None,
+            zipcode=(request.args.get("zipcode") or "").strip() or None,
+            cursor=(request.args.get("cursor") or "").strip() or None,
+        )
+        return jsonify(page)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
 @app.route("/chatbot", methods=["GET", "POST"])
 def chatbot() -> Any:
     # GET -> render page
@@ -437,8 +702,14 @@ def chatbot() -> Any:
         return jsonify({"error": "Empty message"}), 400
 
     try:
-        # Calls the function in chatbot.py which now includes the AI pipeline
-        result = run_chat_pipeline(user_input, city=city, zipcode=zipcode)
+        from chatbot import run_chat_pipeline
+
+        started = time.perf_counter()
+        with metrics.request_trace() as trace:
+            # Calls the function in chatbot.py which now includes the AI pipeline
+            result = run_chat_pipeline(user_input, city=city, zipcode=zipcode)
+            if _chat_timings_enabled():
+                result["timings"] = _finish_trace(trace, started)
         return jsonify(result)
     except Exception as e:
         traceback.print_exc()
@@ -453,5 +724,48 @@ def chatbot() -> Any:
         )
 
 
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route("/chatbot/stream", methods=["POST"])
+def chatbot_stream() -> Any:
+    """
+    Same input as POST /chatbot, but answers as Server-Sent Events: one event
+    per finished pipeline stage (symptoms, predictions, reply, doctors), then
+    "done" with the full JSON response, or "error".
+    """
+    data = request.get_json(force=True) or {}
+    user_input = (data.get("message") or "").strip()
+    city = (data.get("city") or "").strip() or None
+    zipcode = (data.get("zipcode") or "").strip() or None
+
+    if not user_input:
+        return jsonify({"error": "Empty message"}), 400
+
+    from chatbot import iter_chat_pipeline
+
+    with_timings = _chat_timings_enabled()
+
+    def generate() -> Iterator[str]:
+        started = time.perf_counter()
+        with metrics.request_trace() as trace:
+            try:
+                for event, payload in iter_chat_pipeline(user_input, city=city, zipcode=zipcode):
+                    if event == "done" and with_timings:
+                        payload = {**payload, "timings": _finish_trace(trace, started)}
+                    yield _sse(event, payload)
+            except Exception as e:
+                traceback.print_exc()
+                yield _sse("error", {"error": "Internal server error", "details": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Keep proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
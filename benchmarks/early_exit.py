@@ -0,0 +1,144 @@
+"""
+Early-exit forest inference benchmark: CompactForest.predict_proba_early at
+a few `delta` values against the full predict_proba, on the held-out split
+that train_model.build_dataset produces.
+
+A forest is fitted on the training split exactly like train_model.train()
+(the served model_forest.npz is fitted on every record, so its test split
+would be in-sample) and exported to a temporary compact file. Reported per
+delta:
+
+    trees      - mean trees evaluated per prediction
+    single_ms  - p50 / p95 latency of one-row calls (predict_disease_with_ai)
+    batch_ms   - one call over the whole test split
+    top1       - share of rows whose top class matches the full forest
+    top3       - share whose top-3 set matches
+    max_err    - largest absolute probability difference on any class
+    accuracy   - top-1 accuracy against the true labels
+
+Run from the project root; the ontology comes from MySQL like train_model.py,
+or --synthetic N builds a random N-disease ontology instead:
+
+    python benchmarks/early_exit.py
+    python benchmarks/early_exit.py --synthetic 200 --deltas 0.2,0.05,0.01 --json out.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+import train_model  # noqa: E402
+from ml_service import CompactForest, load_npz_mmap  # noqa: E402
+
+
+def synthetic_ontology(n_diseases, n_symptoms=130, seed=0):
+    rng = np.random.default_rng(seed)
+    symptoms = [f"symptom_{i:03d}" for i in range(n_symptoms)]
+    disease_map = {
+        f"Disease {i:03d}": sorted(rng.choice(symptoms, size=int(rng.integers(3, 12)), replace=False).tolist())
+        for i in range(n_diseases)
+    }
+    return disease_map, symptoms
+
+
+def top_k(probs, k):
+    return np.sort(np.argpartition(-probs, k - 1, axis=1)[:, :k], axis=1)
+
+
+def evaluate(forest, X, y, full, delta, min_trees, single_rows):
+    if delta > 0:
+        probs, used = forest.predict_proba_early(X, delta, min_trees)
+    else:
+        probs, used = forest.predict_proba(X), np.full(len(X), forest.n_estimators)
+
+    start = time.perf_counter()
+    if delta > 0:
+        forest.predict_proba_early(X, delta, min_trees)
+    else:
+        forest.predict_proba(X)
+    batch_s = time.perf_counter() - start
+
+    single = []
+    for row in X[:single_rows]:
+        start = time.perf_counter()
+        if delta > 0:
+            forest.predict_proba_early(row[None, :], delta, min_trees)
+        else:
+            forest.predict_proba(row[None, :])
+        single.append(time.perf_counter() - start)
+    single.sort()
+
+    k = min(3, full.shape[1])
+    return {
+        "delta": delta,
+        "trees": round(float(used.mean()), 1),
+        "single_p50_ms": round(statistics.median(single) * 1000, 3),
+        "single_p95_ms": round(single[int(0.95 * (len(single) - 1))] * 1000, 3),
+        "batch_ms": round(batch_s * 1000, 2),
+        "top1": round(float((probs.argmax(axis=1) == full.argmax(axis=1)).mean()), 4),
+        "top3": round(float((top_k(probs, k) == top_k(full, k)).all(axis=1).mean()), 4),
+        "max_err": round(float(np.abs(probs - full).max()), 4),
+        "accuracy": round(float((forest.classes_[probs.argmax(axis=1)] == y).mean()), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="random ontology with N diseases instead of MySQL")
+    parser.add_argument("--samples-per-disease", type=int, default=100)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--deltas", default="0.2,0.1,0.05,0.01,0.001")
+    parser.add_argument("--min-trees", type=int, default=16)
+    parser.add_argument("--single-rows", type=int, default=500, help="test rows timed one at a time")
+    parser.add_argument("--json", help="optional path to save results")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        disease_map, all_symptoms = synthetic_ontology(args.synthetic, seed=args.seed)
+    else:
+        disease_map, all_symptoms = train_model.get_db_data()
+    X_train, X_test, y_train, y_test, mlb = train_model.build_dataset(
+        disease_map, all_symptoms, samples_per_disease=args.samples_per_disease, seed=args.seed
+    )
+    clf = RandomForestClassifier(n_estimators=args.n_estimators, random_state=args.seed, n_jobs=-1)
+    clf.fit(X_train, y_train)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "forest.npz")
+        train_model.export_compact_model(clf, mlb, path=path)
+        forest = CompactForest({k: np.array(v) for k, v in load_npz_mmap(path).items()})
+
+    X = X_test.astype(np.float32)
+    full = forest.predict_proba(X)
+    print(f"{len(disease_map)} diseases, {len(X)} test rows, {forest.n_estimators} trees "
+          f"(matches sklearn: {np.allclose(full, clf.predict_proba(X_test))})")
+
+    results = []
+    for delta in [0.0] + [float(d) for d in args.deltas.split(",") if d.strip()]:
+        res = evaluate(forest, X, y_test, full, delta, args.min_trees, args.single_rows)
+        results.append(res)
+        label = "full" if delta == 0 else f"{delta:g}"
+        print(f"delta {label:>6}: {res['trees']:6.1f} trees  single p50 {res['single_p50_ms']:6.3f} "
+              f"p95 {res['single_p95_ms']:6.3f} ms  batch {res['batch_ms']:8.2f} ms  "
+              f"top1 {res['top1']:.4f}  top3 {res['top3']:.4f}  max_err {res['max_err']:.3f}  "
+              f"acc {res['accuracy']:.4f}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"diseases": len(disease_map), "test_rows": len(X), "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
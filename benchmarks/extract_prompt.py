@@ -0,0 +1,129 @@
+"""
+Symptom-extraction prompt benchmark: the v1 prompt (every SYMPTOMS entry in
+set order plus the long rules block) against build_extract_prompt().
+
+Always reports, per sample message and in total:
+
+    tokens   - prompt size; a chars/4 estimate offline, or Gemini's
+               count_tokens with --count-tokens
+    recall   - whether the expected symptoms survive the prefilter, i.e.
+               are still offered to the LLM
+
+With --live N each prompt is also sent N times through chatbot.GEMINI and the
+end-to-end latency is reported. Point GEMINI_API_ENDPOINT at a local fake
+server to measure the client without spending quota.
+
+Run from the project root:
+
+    python benchmarks/extract_prompt.py
+    python benchmarks/extract_prompt.py --count-tokens --live 5 --json out.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (message, symptoms a correct answer contains)
+SAMPLES = [
+    ("I have been vomitting and my stomach is killing me", ["vomiting", "stomach_pain"]),
+    ("no fever but a bad cough and runny nose", ["cough", "runny_nose"]),
+    ("itchy skin with red spots all over my body", ["itching", "red_spots_over_body"]),
+    ("my joints ache and my knees are swollen", ["joint_pain"]),
+    ("yellow eyes, dark urine and I'm always tired", ["yellowing_of_eyes", "dark_urine", "fatigue"]),
+    ("my head hurts and I feel hot", ["headache"]),
+    ("can't focus and my mood is all over the place", ["mood_swings"]),
+    ("chest pain when breathing and I get breathless climbing stairs", ["chest_pain", "breathlessness"]),
+]
+
+
+def legacy_prompt(user_input, symptoms):
+    """The v1 extract_symptoms prompt, verbatim."""
+    return f"""
+        You are an AI model that extracts symptoms from user input. Only return the extracted symptoms in a comma-separated
+        list, strictly matching the recognized symptoms.
+
+        User Input: "{user_input}"
+        Recognized Symptoms: {', '.join(symptoms)}
+
+        **Rules**:
+        - Strictly adhere to the given set and match symptoms from there.
+        - Do not make symptoms on your own, those will not be recognized.
+        - ONLY return the final symptom list.
+        - DO NOT include explanations, thoughts, or analysis.
+        - If no symptoms match, return an empty string.
+        - Your response MUST start with [ and end with ].
+        - The response format is: [symptom1, symptom2, symptom3]
+        - FAIL IF YOU DON'T FOLLOW THE FORMAT.
+    """
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count-tokens", action="store_true", help="use Gemini count_tokens instead of chars/4")
+    parser.add_argument("--live", type=int, default=0, metavar="N", help="send each prompt N times and time it")
+    parser.add_argument("--json", help="optional path to save results")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    import chatbot
+
+    def tokens(prompt):
+        if args.count_tokens:
+            return chatbot.GEMINI.get_model().count_tokens(prompt).total_tokens
+        return round(len(prompt) / 4)
+
+    def latency_ms(prompt):
+        timings = []
+        for _ in range(args.live):
+            start = time.perf_counter()
+            chatbot.call_gemini(prompt)
+            timings.append(time.perf_counter() - start)
+        return round(statistics.median(timings) * 1000, 1)
+
+    rows = []
+    for message, expected in SAMPLES:
+        before = legacy_prompt(message, chatbot.SYMPTOMS)
+        start = time.perf_counter()
+        after = chatbot.build_extract_prompt(message)
+        build_ms = (time.perf_counter() - start) * 1000
+        offered = after.split("Vocabulary: ", 1)[1].split("\n", 1)[0].split(",")
+        row = {
+            "message": message,
+            "tokens_before": tokens(before),
+            "tokens_after": tokens(after),
+            "vocabulary_after": len(offered),
+            "recall": all(s in offered for s in expected),
+            "build_ms": round(build_ms, 3),
+        }
+        if args.live:
+            row["latency_ms_before"] = latency_ms(before)
+            row["latency_ms_after"] = latency_ms(after)
+        rows.append(row)
+        live = (f"  latency {row['latency_ms_before']:7.1f} -> {row['latency_ms_after']:7.1f} ms"
+                if args.live else "")
+        print(f"{row['tokens_before']:5d} -> {row['tokens_after']:5d} tok  "
+              f"vocab {row['vocabulary_after']:3d}  recall {'ok ' if row['recall'] else 'MISS'}{live}  {message}")
+
+    summary = {
+        "tokens_before": sum(r["tokens_before"] for r in rows),
+        "tokens_after": sum(r["tokens_after"] for r in rows),
+        "recall": round(sum(r["recall"] for r in rows) / len(rows), 3),
+        "token_counter": "gemini" if args.count_tokens else "chars/4",
+    }
+    if args.live:
+        summary["median_latency_ms_before"] = round(statistics.median(r["latency_ms_before"] for r in rows), 1)
+        summary["median_latency_ms_after"] = round(statistics.median(r["latency_ms_after"] for r in rows), 1)
+    print(json.dumps(summary, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"summary": summary, "samples": rows}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Stub Gemini server for load tests: speaks just enough of the REST API
+(generateContent, countTokens) for llm_client.GeminiClient, with
+configurable latency and failure rate and no quota.
+
+    python benchmarks/fake_gemini.py --port 8099 --latency-ms 400 --jitter-ms 150
+
+Then start the app against it:
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8099 python app.py
+
+Answers are plausible rather than smart: extraction prompts get back the
+vocabulary entries whose words appear in the message, diagnosis prompts a
+fixed disease with the first specialization offered.
+"""
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def answer(prompt):
+    vocabulary = re.search(r"^Vocabulary: (.*)$", prompt, re.MULTILINE)
+    message = re.search(r'^Message: "(.*)"$', prompt, re.MULTILINE)
+    if vocabulary and message:
+        words = set(re.findall(r"[a-z]+", message.group(1).lower()))
+        found = [s for s in vocabulary.group(1).split(",") if set(re.findall(r"[a-z]+", s)) & words]
+        return f"[{', '.join(found[:5])}]"
+
+    specializations = re.search(r"from this list: ([^\n]*)", prompt)
+    specialty = specializations.group(1).split(",")[0].strip() if specializations else "FAMILY PRACTICE"
+    return json.dumps({"disease": "Common Cold", "specialization": specialty})
+
+
+class Handler(BaseHTTPRequestHandler):
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        prompt_tokens = max(1, len(prompt) // 4)
+
+        if self.path.split("?")[0].endswith(":countTokens"):
+            return self._send(200, {"totalTokens": prompt_tokens})
+
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if random.random() < self.error_rate:
+            return self._send(503, {"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}})
+
+        text = answer(prompt)
+        self._send(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": max(1, len(text) // 4),
+                "totalTokenCount": prompt_tokens + max(1, len(text) // 4),
+            },
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="std dev of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 503")
+    args = parser.parse_args()
+
+    Handler.latency = args.latency_ms / 1000
+    Handler.jitter = args.jitter_ms / 1000
+    Handler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Fake Gemini on http://{args.host}:{args.port} "
+          f"({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.error_rate:.0%} errors)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
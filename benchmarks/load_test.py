@@ -0,0 +1,181 @@
+"""
+Closed-loop load driver for a running MediBuddy instance.
+
+Each endpoint is hit by --concurrency workers for --duration seconds (one
+request in flight per worker, each with its own session cookie) and gets
+p50/p95/p99 latency, RPS and error counts.
+
+Typical run against the benchmark stand-ins:
+
+    python benchmarks/fake_gemini.py --latency-ms 400 &
+    python benchmarks/seed_data.py --database aloo_bench --create-schema --reset --scale 100
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8099 MYSQL_DATABASE=aloo_bench python app.py &
+    python benchmarks/load_test.py --json results/after.json --compare results/before.json
+
+--compare prints the change against an earlier --json file, so the same
+scenario can be re-run after a change to catch regressions.
+"""
+import argparse
+import datetime
+import http.cookiejar
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_MESSAGES = [
+    "I have a headache and high fever since yesterday",
+    "no fever but a bad cough and runny nose",
+    "itchy skin with red spots all over my body",
+    "I have been vomitting and my stomach is killing me",
+    "yellow eyes, dark urine and I'm always tired",
+    "chest pain when breathing and I get breathless climbing stairs",
+]
+
+ENDPOINTS = {
+    "chatbot": ("POST", "/chatbot"),
+    "prescriptions": ("GET", "/prescriptions"),
+    "reminders": ("GET", "/reminders"),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def make_request(base_url, endpoint, n):
+    method, path = ENDPOINTS[endpoint]
+    if method == "POST":
+        body = {"message": CHAT_MESSAGES[n % len(CHAT_MESSAGES)], "zipcode": "60617"}
+        return urllib.request.Request(
+            base_url + path, data=json.dumps(body).encode(), method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+    return urllib.request.Request(base_url + path, method=method)
+
+
+def run_endpoint(base_url, endpoint, concurrency, duration, timeout):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(worker_id):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        n = worker_id
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                with opener.open(make_request(base_url, endpoint, n), timeout=timeout) as resp:
+                    resp.read()
+                error = None
+            except urllib.error.HTTPError as e:
+                error = f"HTTP {e.code}"
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error:
+                    errors.append(error)
+                else:
+                    latencies.append(elapsed)
+            n += concurrency
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "error_kinds": {kind: errors.count(kind) for kind in sorted(set(errors))},
+        "rps": round(len(latencies) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)["results"]
+    print(f"\nvs {baseline_path}:")
+    for endpoint, current in results.items():
+        before = baseline.get(endpoint)
+        if not before:
+            continue
+        deltas = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (current[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {endpoint:>13}: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of "
+                        + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per endpoint")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--json", help="optional path to save results")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    args = parser.parse_args()
+
+    results = {}
+    for endpoint in [e.strip() for e in args.endpoints.split(",") if e.strip()]:
+        if endpoint not in ENDPOINTS:
+            parser.error(f"unknown endpoint {endpoint!r}")
+        res = results[endpoint] = run_endpoint(args.url.rstrip("/"), endpoint, args.concurrency,
+                                               args.duration, args.timeout)
+        print(f"{endpoint:>13}: {res['rps']:8.1f} rps  p50 {res['p50_ms']:8.1f}  p95 {res['p95_ms']:8.1f}  "
+              f"p99 {res['p99_ms']:8.1f} ms  ({res['requests']} requests, {res['errors']} errors)")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, "w") as fh:
+            json.dump({
+                "meta": {
+                    "url": args.url,
+                    "concurrency": args.concurrency,
+                    "duration_s": args.duration,
+                    "git_revision": git_revision(),
+                    "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Ontology import benchmark: chatbot.bulk_insert_disease_entries against the
+old one-symptom-at-a-time path (SELECT + maybe INSERT per symptom, one
+disease_symptom INSERT per link), on synthetic entries.
+
+Reports wall time and DB statements (from metrics.py) for each. Run it
+against a throwaway database; both paths write "Import Disease NNNN" rows:
+
+    python benchmarks/seed_data.py --database aloo_bench --create-schema --reset
+    MYSQL_DATABASE=aloo_bench python benchmarks/ontology_import.py --entries 500 --legacy
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+# No model refit per import while benchmarking
+os.environ.setdefault("ML_AUTO_RETRAIN", "0")
+
+import metrics  # noqa: E402
+import chatbot  # noqa: E402
+
+SPECIALTIES = ["CARDIOLOGY", "DERMATOLOGY", "GASTROENTEROLOGY", "NEUROLOGY", "FAMILY PRACTICE",
+               "INTERNAL MEDICINE", "PULMONARY DISEASE", "ENDOCRINOLOGY"]
+
+
+def make_entries(n, prefix, seed):
+    rng = random.Random(seed)
+    vocabulary = sorted(chatbot.SYMPTOMS)
+    entries = []
+    for i in range(n):
+        symptoms = rng.sample(vocabulary, rng.randint(5, 15))
+        symptoms += [f"{prefix.lower()}_symptom_{rng.randrange(n)}" for _ in range(rng.randint(0, 3))]
+        entries.append((f"{prefix} Disease {i:04d}", rng.choice(SPECIALTIES), symptoms))
+    return entries
+
+
+def legacy_insert(disease, specialization, symptoms):
+    """The pre-bulk insert_disease_entry: one SELECT (+ INSERT) per name, one INSERT per link."""
+    conn = chatbot.get_mysql_conn()
+    try:
+        cur = conn.cursor()
+
+        def get_or_create(select_sql, insert_sql, key, *extra):
+            cur.execute(select_sql, (key,))
+            row = cur.fetchone()
+            if row:
+                return row[0]
+            new_id = str(uuid.uuid4())
+            cur.execute(insert_sql, (new_id, key, *extra))
+            return new_id
+
+        spec_id = get_or_create("SELECT specialty_id FROM specialty WHERE UPPER(specialty_name) = %s",
+                                "INSERT INTO specialty (specialty_id, specialty_name) VALUES (%s, %s)",
+                                specialization.upper())
+        disease_id = get_or_create("SELECT disease_id FROM disease WHERE disease_name = %s",
+                                   "INSERT INTO disease (disease_id, disease_name, specialty_id) VALUES (%s, %s, %s)",
+                                   disease, spec_id)
+        for symptom in symptoms:
+            symptom_id = get_or_create("SELECT symptom_id FROM symptom WHERE symptom_name = %s",
+                                       "INSERT INTO symptom (symptom_id, symptom_name) VALUES (%s, %s)", symptom)
+            cur.execute("INSERT INTO disease_symptom (disease_id, symptom_id) VALUES (%s, %s) "
+                        "ON DUPLICATE KEY UPDATE disease_id = disease_id", (disease_id, symptom_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def timed(label, fn):
+    trace = metrics.start_trace()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed:8.3f}s  {trace['db']['queries']:6d} statements  "
+          f"{trace['db']['seconds']:8.3f}s in MySQL")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--legacy", action="store_true", help="also time the old per-symptom path")
+    args = parser.parse_args()
+
+    bulk_entries = make_entries(args.entries, "Import", args.seed)
+    links = sum(len(symptoms) for _, _, symptoms in bulk_entries)
+    print(f"{args.entries} entries, {links} disease/symptom links")
+
+    timed("bulk", lambda: chatbot.bulk_insert_disease_entries(bulk_entries))
+    if args.legacy:
+        legacy_entries = make_entries(args.entries, "Legacy", args.seed)
+        timed("legacy", lambda: [legacy_insert(*entry) for entry in legacy_entries])
+
+
+if __name__ == "__main__":
+    main()
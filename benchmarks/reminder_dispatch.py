@@ -0,0 +1,137 @@
+"""
+Reminder dispatcher scale check: fills reminder_dispatch.ReminderScheduler
+with synthetic rows (random users across time zones and preferred windows),
+cancels a share of them, then drains the heap in simulated time.
+
+Reports per phase:
+
+    add      - rows/s through add() (fire-time math + heap push)
+    cancel   - ids/s through cancel()
+    drain    - deliveries/s with a no-op sink, popping by simulated time
+    memory   - traced Python allocations held by the scheduler
+
+No database is touched; the DB loader only feeds add_many() in production.
+
+Run from the project root:
+
+    python benchmarks/reminder_dispatch.py --reminders 100000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reminder_dispatch import ReminderScheduler  # noqa: E402
+
+TIME_ZONES = ["America/Chicago", "America/New_York", "America/Los_Angeles", "Europe/London",
+              "Asia/Kolkata", "Australia/Sydney", "Pacific/Kiritimati", "UTC"]
+WINDOWS = [(datetime.time(8), datetime.time(20)), (datetime.time(7), datetime.time(22)),
+           (datetime.time(22), datetime.time(6)), (None, None)]
+
+
+class CountingSink:
+    def __init__(self):
+        self.count = 0
+
+    def send(self, reminder):
+        self.count += 1
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_rows(n, users, start, hours, seed):
+    rng = random.Random(seed)
+    profiles = [(rng.choice(TIME_ZONES), *rng.choice(WINDOWS)) for _ in range(users)]
+    rows = []
+    for _ in range(n):
+        user = rng.randrange(users)
+        tz, window_start, window_end = profiles[user]
+        rows.append({
+            "reminder_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": f"user-{user}",
+            "rx_id": f"rx-{user}-{rng.randrange(4)}",
+            "remind_time": start + datetime.timedelta(seconds=rng.randrange(int(hours * 3600))),
+            "frequency": "daily",
+            "drug_name": "Ibuprofen",
+            "time_zone": tz,
+            "preferred_window_start": window_start,
+            "preferred_window_end": window_end,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--hours", type=float, default=24.0, help="spread of remind_time")
+    parser.add_argument("--cancel", type=float, default=0.1, help="share of reminders cancelled")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="optional path to save results")
+    args = parser.parse_args()
+
+    start = datetime.datetime(2026, 3, 7, 0, 0)  # spans the US DST switch
+    rows = make_rows(args.reminders, args.users, start, args.hours, args.seed)
+    clock = FakeClock(start.replace(tzinfo=datetime.timezone.utc).timestamp() - 86400)
+    sink = CountingSink()
+    scheduler = ReminderScheduler(sink, connect=None, catchup=0, clock=clock)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    scheduled = scheduler.add_many(rows)
+    add_s = time.perf_counter() - t0
+    held_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    cancelled_ids = [r["reminder_id"] for r in random.Random(args.seed).sample(rows, int(len(rows) * args.cancel))]
+    t0 = time.perf_counter()
+    for rid in cancelled_ids:
+        scheduler.cancel(rid)
+    cancel_s = time.perf_counter() - t0
+
+    deferred = sum(1 for entry in scheduler._pending.values() if entry.deferred)
+    t0 = time.perf_counter()
+    last = scheduler._next_due()
+    while last is not None:
+        clock.now = last + 60
+        scheduler.dispatch_due()
+        last = scheduler._next_due()
+    drain_s = time.perf_counter() - t0
+
+    results = {
+        "reminders": args.reminders,
+        "scheduled": scheduled,
+        "deferred_by_window": deferred,
+        "cancelled": len(cancelled_ids),
+        "delivered": sink.count,
+        "add_per_s": round(scheduled / add_s),
+        "cancel_per_s": round(len(cancelled_ids) / cancel_s) if cancel_s else None,
+        "drain_per_s": round(sink.count / drain_s) if drain_s else None,
+        "memory_mb": round(held_mb, 1),
+    }
+    for key, value in results.items():
+        print(f"{key:>20}: {value}")
+    if sink.count != scheduled - len(cancelled_ids):
+        print("MISMATCH: delivered count does not equal scheduled minus cancelled")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+-- Benchmark stand-in schema
+-- ======================================================
+-- Only the tables and columns the app reads or writes, for a throwaway
+-- benchmark database (benchmarks/seed_data.py --create-schema). The full
+-- schema lives in aloo-dump/aloo-dump.sql; prefer that when you have it.
+
+CREATE TABLE IF NOT EXISTS user (
+    user_id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    time_zone VARCHAR(64) NOT NULL DEFAULT 'America/Chicago',
+    preferred_window_start TIME NOT NULL DEFAULT '08:00:00',
+    preferred_window_end TIME NOT NULL DEFAULT '20:00:00'
+);
+
+CREATE TABLE IF NOT EXISTS drug (
+    drug_id VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    rxnorm_code VARCHAR(32)
+);
+
+CREATE TABLE IF NOT EXISTS prescription (
+    rx_id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    drug_id VARCHAR(36) NOT NULL,
+    frequency VARCHAR(64) NOT NULL,
+    qty_on_hand INT NOT NULL DEFAULT 0,
+    refills INT NOT NULL DEFAULT 0,
+    rx_text TEXT,
+    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE,
+    FOREIGN KEY (drug_id) REFERENCES drug (drug_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS reminder (
+    reminder_id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    rx_id VARCHAR(36) NOT NULL,
+    remind_time DATETIME NOT NULL,
+    override_frequency VARCHAR(64),
+    FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE CASCADE,
+    FOREIGN KEY (rx_id) REFERENCES prescription (rx_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS specialty (
+    specialty_id VARCHAR(255) PRIMARY KEY,
+    specialty_name VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS doctor (
+    doctor_id VARCHAR(255) PRIMARY KEY,
+    first_name VARCHAR(255),
+    last_name VARCHAR(255),
+    specialty_id VARCHAR(255),
+    address_line1 VARCHAR(255),
+    city VARCHAR(255),
+    state VARCHAR(2),
+    zip_code VARCHAR(20),
+    phone_number VARCHAR(50),
+    FOREIGN KEY (specialty_id) REFERENCES specialty (specialty_id)
+);
+
+CREATE TABLE IF NOT EXISTS disease (
+    disease_id VARCHAR(36) PRIMARY KEY,
+    disease_name VARCHAR(255) NOT NULL UNIQUE,
+    specialty_id VARCHAR(255),
+    FOREIGN KEY (specialty_id) REFERENCES specialty (specialty_id)
+);
+
+CREATE TABLE IF NOT EXISTS symptom (
+    symptom_id VARCHAR(36) PRIMARY KEY,
+    symptom_name VARCHAR(255) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS disease_symptom (
+    disease_id VARCHAR(36) NOT NULL,
+    symptom_id VARCHAR(36) NOT NULL,
+    PRIMARY KEY (disease_id, symptom_id),
+    FOREIGN KEY (disease_id) REFERENCES disease (disease_id) ON DELETE CASCADE,
+    FOREIGN KEY (symptom_id) REFERENCES symptom (symptom_id) ON DELETE CASCADE
+);
@@ -0,0 +1,267 @@
+"""
+Seed a throwaway MySQL database with MediBuddy data scaled to N times the
+size of aloo-dump/aloo-other-tables.sql, for load tests.
+
+    python benchmarks/seed_data.py --database aloo_bench --create-schema --reset --scale 100
+
+Scaled with --scale (base sizes come from the dump):
+    users          21 per unit of scale
+    prescriptions  --prescriptions-per-user per user (dump: 1)
+    reminders      --reminders-per-prescription per prescription (dump: 1)
+    doctors        200 per unit of scale, clustered around ten metro areas
+
+Not scaled: the 25 drugs, the specialty list and a synthetic 41-disease
+ontology over chatbot.SYMPTOMS (only written when the disease table is
+empty). Train a model on it afterwards so /chatbot has predictions:
+
+    MYSQL_DATABASE=aloo_bench python train_model.py
+
+--create-schema applies benchmarks/schema.sql and the index files in
+aloo-dump/ (doctor search, reminder calendar, reminder dispatch). Credentials come from config/api.env
+like the app (db.MYSQL_CONFIG); only the database name is overridden.
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector  # noqa: E402
+
+BASE_USERS = 21
+BASE_DOCTORS = 200
+N_DISEASES = 41
+BATCH_SIZE = 5000
+
+# Same drugs as aloo-dump/aloo-other-tables.sql
+DRUGS = [
+    ("Lisinopril 10mg", "197361"), ("Atorvastatin 20mg", "259255"), ("Levothyroxine 50mcg", "10582"),
+    ("Metformin 500mg", "860975"), ("Amlodipine 5mg", "17767"), ("Metoprolol 25mg", "866414"),
+    ("Omeprazole 20mg", "312109"), ("Losartan 50mg", "213269"), ("Gabapentin 300mg", "213479"),
+    ("Hydrochlorothiazide 25mg", "310798"), ("Sertraline 50mg", "312935"), ("Simvastatin 20mg", "312961"),
+    ("Montelukast 10mg", "312077"), ("Escitalopram 10mg", "321952"), ("Acetaminophen 500mg", "161"),
+    ("Ibuprofen 200mg", "197803"), ("Albuterol Inhaler", "745678"), ("Amoxicillin 500mg", "197313"),
+    ("Prednisone 10mg", "312535"), ("Trazodone 50mg", "313319"), ("Fluticasone Spray", "307362"),
+    ("Tramadol 50mg", "313253"), ("Clonazepam 0.5mg", "197480"), ("Insulin Glargine", "274783"),
+    ("Pantoprazole 40mg", "312273"),
+]
+FREQUENCIES = ["Once daily", "Twice daily", "As needed", "Before bed"]
+TIME_ZONES = ["America/Chicago", "America/New_York", "America/Los_Angeles", "America/Denver",
+              "Europe/London", "Asia/Tokyo"]
+METROS = [
+    ("CHICAGO", "IL", "606"), ("NEW YORK", "NY", "100"), ("LOS ANGELES", "CA", "900"),
+    ("HOUSTON", "TX", "770"), ("PHOENIX", "AZ", "850"), ("PHILADELPHIA", "PA", "191"),
+    ("SAN ANTONIO", "TX", "782"), ("SAN DIEGO", "CA", "921"), ("DALLAS", "TX", "752"),
+    ("SEATTLE", "WA", "981"),
+]
+FIRST_NAMES = ["ALICE", "BOB", "CAROL", "DAVID", "ELENA", "FARID", "GRACE", "HIRO", "IMANI", "JONAS",
+               "KAREN", "LUIS", "MEI", "NIKHIL", "OLGA", "PEDRO", "QUINN", "RANIA", "SAM", "TARA"]
+LAST_NAMES = ["NGUYEN", "SMITH", "GARCIA", "PATEL", "KIM", "JOHNSON", "LOPEZ", "CHEN", "BROWN",
+              "OKAFOR", "MILLER", "SINGH", "DAVIS", "MARTIN", "ROSSI", "KHAN", "WILSON", "COHEN"]
+
+TABLES = ["reminder", "prescription", "user", "drug", "doctor",
+          "disease_symptom", "symptom", "disease", "specialty"]
+
+
+def run_sql_file(cur, path):
+    with open(path) as fh:
+        lines = [line for line in fh if not line.lstrip().startswith("--")]
+    for statement in "".join(lines).split(";"):
+        if statement.strip():
+            cur.execute(statement)
+
+
+def insert_many(conn, sql, rows):
+    cur = conn.cursor()
+    for i in range(0, len(rows), BATCH_SIZE):
+        cur.executemany(sql, rows[i:i + BATCH_SIZE])
+    conn.commit()
+    cur.close()
+
+
+def ensure_schema(conn, database):
+    cur = conn.cursor()
+    run_sql_file(cur, os.path.join(ROOT, "benchmarks", "schema.sql"))
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = %s AND table_name = 'specialty' AND column_name = 'specialty_name_norm'",
+        (database,),
+    )
+    if cur.fetchone()[0] == 0:
+        run_sql_file(cur, os.path.join(ROOT, "aloo-dump", "doctor_search_indexes.sql"))
+    cur.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics "
+        "WHERE table_schema = %s AND table_name = 'reminder'",
+        (database,),
+    )
+    existing = {row[0] for row in cur.fetchall()}
+    for index_name, filename in (("idx_reminder_user_time", "reminder_indexes.sql"),
+                                 ("idx_reminder_time", "reminder_dispatch_indexes.sql")):
+        if index_name not in existing:
+            run_sql_file(cur, os.path.join(ROOT, "aloo-dump", filename))
+    conn.commit()
+    cur.close()
+
+
+def reset(conn):
+    cur = conn.cursor()
+    cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in TABLES:
+        cur.execute(f"TRUNCATE TABLE {table}")
+    cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+    conn.commit()
+    cur.close()
+
+
+def metro_zips():
+    by_prefix = {prefix: [] for _, _, prefix in METROS}
+    with open(os.path.join(ROOT, "data", "us_zip_centroids.csv"), newline="") as fh:
+        for row in csv.DictReader(fh):
+            if row["zip"][:3] in by_prefix:
+                by_prefix[row["zip"][:3]].append(row["zip"])
+    return by_prefix
+
+
+def seed_specialties(conn, rng):
+    from chatbot import SPECIALIZATIONS
+    cur = conn.cursor()
+    cur.execute("SELECT specialty_id, specialty_name FROM specialty")
+    existing = {name.upper(): sid for sid, name in cur.fetchall()}
+    cur.close()
+    new = [(str(uuid.uuid4()), name) for name in sorted(SPECIALIZATIONS) if name not in existing]
+    insert_many(conn, "INSERT INTO specialty (specialty_id, specialty_name) VALUES (%s, %s)", new)
+    existing.update({name: sid for sid, name in new})
+    return existing
+
+
+def seed_ontology(conn, rng, specialties):
+    from chatbot import SYMPTOMS
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM disease")
+    has_diseases = cur.fetchone()[0] > 0
+    cur.close()
+    if has_diseases:
+        return 0
+
+    symptom_ids = {name: str(uuid.uuid4()) for name in sorted(SYMPTOMS)}
+    insert_many(conn, "INSERT INTO symptom (symptom_id, symptom_name) VALUES (%s, %s)",
+                [(sid, name) for name, sid in symptom_ids.items()])
+
+    specialty_names = sorted(specialties)
+    diseases, links = [], []
+    for i in range(N_DISEASES):
+        disease_id = str(uuid.uuid4())
+        diseases.append((disease_id, f"Bench Disease {i + 1:03d}", specialties[rng.choice(specialty_names)]))
+        for symptom in rng.sample(sorted(symptom_ids), rng.randint(4, 10)):
+            links.append((disease_id, symptom_ids[symptom]))
+    insert_many(conn, "INSERT INTO disease (disease_id, disease_name, specialty_id) VALUES (%s, %s, %s)", diseases)
+    insert_many(conn, "INSERT INTO disease_symptom (disease_id, symptom_id) VALUES (%s, %s)", links)
+    return len(diseases)
+
+
+def seed_drugs(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT drug_id FROM drug")
+    ids = [row[0] for row in cur.fetchall()]
+    cur.close()
+    if ids:
+        return ids
+    rows = [(str(uuid.uuid4()), name, code) for name, code in DRUGS]
+    insert_many(conn, "INSERT INTO drug (drug_id, name, rxnorm_code) VALUES (%s, %s, %s)", rows)
+    return [row[0] for row in rows]
+
+
+def seed_people(conn, rng, scale, rx_per_user, reminders_per_rx, drug_ids):
+    run = uuid.uuid4().hex[:8]  # keeps emails unique across repeated runs
+    users, prescriptions, reminders = [], [], []
+    month_start = datetime.datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for i in range(BASE_USERS * scale):
+        user_id = str(uuid.uuid4())
+        start_hour = rng.randint(6, 10)
+        users.append((user_id, f"Bench User {i}", f"bench.{run}.{i}@example.com", rng.choice(TIME_ZONES),
+                      f"{start_hour:02d}:00:00", f"{start_hour + 12:02d}:00:00"))
+        for _ in range(rx_per_user):
+            rx_id = str(uuid.uuid4())
+            prescriptions.append((rx_id, user_id, rng.choice(drug_ids), rng.choice(FREQUENCIES),
+                                  rng.randint(10, 90), rng.randint(0, 4), "Take with plenty of water"))
+            for _ in range(reminders_per_rx):
+                remind_time = month_start + datetime.timedelta(days=rng.randint(-15, 45),
+                                                               minutes=rng.randint(8 * 60, 20 * 60))
+                reminders.append((str(uuid.uuid4()), user_id, rx_id, remind_time))
+
+    insert_many(conn, "INSERT INTO user (user_id, name, email, time_zone, preferred_window_start, "
+                      "preferred_window_end) VALUES (%s, %s, %s, %s, %s, %s)", users)
+    insert_many(conn, "INSERT INTO prescription (rx_id, user_id, drug_id, frequency, qty_on_hand, refills, "
+                      "rx_text) VALUES (%s, %s, %s, %s, %s, %s, %s)", prescriptions)
+    insert_many(conn, "INSERT INTO reminder (reminder_id, user_id, rx_id, remind_time) "
+                      "VALUES (%s, %s, %s, %s)", reminders)
+    return len(users), len(prescriptions), len(reminders)
+
+
+def seed_doctors(conn, rng, scale, specialties):
+    zips = metro_zips()
+    specialty_ids = [specialties[name] for name in sorted(specialties)]
+    rows = []
+    for _ in range(BASE_DOCTORS * scale):
+        city, state, prefix = rng.choice(METROS)
+        rows.append((
+            str(uuid.uuid4()), rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(specialty_ids),
+            f"{rng.randint(1, 9999)} MAIN ST", city, state,
+            rng.choice(zips[prefix]) if zips[prefix] else f"{prefix}01",
+            f"{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}",
+        ))
+    insert_many(conn, "INSERT INTO doctor (doctor_id, first_name, last_name, specialty_id, address_line1, "
+                      "city, state, zip_code, phone_number) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="aloo_bench")
+    parser.add_argument("--scale", type=int, default=10, help="multiple of the dump size (10-1000)")
+    parser.add_argument("--prescriptions-per-user", type=int, default=1)
+    parser.add_argument("--reminders-per-prescription", type=int, default=1)
+    parser.add_argument("--create-schema", action="store_true")
+    parser.add_argument("--reset", action="store_true", help="truncate all seeded tables first")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from db import MYSQL_CONFIG
+
+    config = {k: v for k, v in MYSQL_CONFIG.items() if k != "database"}
+    conn = mysql.connector.connect(**config)
+    cur = conn.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    cur.close()
+    conn.database = args.database
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    if args.create_schema:
+        ensure_schema(conn, args.database)
+    if args.reset:
+        reset(conn)
+
+    specialties = seed_specialties(conn, rng)
+    diseases = seed_ontology(conn, rng, specialties)
+    drug_ids = seed_drugs(conn)
+    users, prescriptions, reminders = seed_people(
+        conn, rng, args.scale, args.prescriptions_per_user, args.reminders_per_prescription, drug_ids
+    )
+    doctors = seed_doctors(conn, rng, args.scale, specialties)
+    conn.close()
+
+    print(f"Seeded {args.database} at {args.scale}x in {time.perf_counter() - start:.1f}s: "
+          f"{users} users, {prescriptions} prescriptions, {reminders} reminders, "
+          f"{doctors} doctors, {diseases} new diseases")
+
+
+if __name__ == "__main__":
+    main()
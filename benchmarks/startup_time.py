@@ -0,0 +1,73 @@
+"""
+Startup-time benchmark for the Flask app.
+
+Runs each scenario in a fresh interpreter (so nothing is cached in-process)
+and reports how long it takes before the app object is importable:
+
+    eager  - what importing app.py used to cost: chatbot.py, the ML model,
+             google-generativeai and pandas all loaded up front
+    lazy   - importing app.py today with the warm-up thread disabled
+
+Run from the project root (so model_forest.npz / config/api.env resolve):
+
+    python benchmarks/startup_time.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "eager": "import app, chatbot; chatbot.warm_up()",
+    "lazy": "import app",
+}
+
+CHILD = """
+import time, sys
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{stmt}
+print("ELAPSED", time.perf_counter() - t0)
+"""
+
+
+def run_once(stmt):
+    env = dict(os.environ, WARMUP_ON_START="0", PYTHONWARNINGS="ignore")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT, stmt=stmt)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    for line in out.splitlines():
+        if line.startswith("ELAPSED"):
+            return float(line.split()[1])
+    raise RuntimeError(f"no timing in output: {out!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="optional path to save results")
+    args = parser.parse_args()
+
+    results = {}
+    for name, stmt in SCENARIOS.items():
+        timings = [run_once(stmt) for _ in range(args.runs)]
+        results[name] = {
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "max_ms": round(max(timings) * 1000, 1),
+        }
+        print(f"{name:>6}: median {results[name]['median_ms']:8.1f} ms  "
+              f"(min {results[name]['min_ms']:.1f}, max {results[name]['max_ms']:.1f}, n={args.runs})")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,40 @@
+import contextvars
 import json
 import os
 import re
+import threading
+import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import google.generativeai as genai
-import mysql.connector
-import pandas as pd
 from dotenv import load_dotenv
 
+from db import get_connection
+from doctor_geo import find_nearest_doctors, get_doctor_geo_index
+from llm_cache import ResponseCache, cache_key
+from llm_client import GeminiClient, LLMUnavailable
+from metrics import stage_timer
+from symptom_matcher import SYNONYMS, SymptomMatcher, SymptomPrefilter
+from ontology import (
+    get_specialty,
+    get_specialty_map,
+    get_symptom_index,
+    invalidate as invalidate_ontology,
+)
+
 # --- NEW: Import the AI Service ---
-from ml_service import predict_disease_with_ai
+from ml_service import ensure_model_loaded, predict_disease_with_ai, request_retrain
 
 # =============================================================================
 # CONFIG
 # =============================================================================
 
-MYSQL_CONFIG = {
-    "host": "localhost",
-    "port": 3306,
-    "user": "root",
-    "password": "[PASSWORD]",
-    "database": "[DATABASE_NAME]",
-    "charset": "utf8mb4",
-    "use_unicode": True,
-}
-
 # API key lives in config/api.env at project root
 load_dotenv("config/api.env")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = "gemini-2.5-flash-lite"
 
-genai.configure(api_key=GEMINI_API_KEY)
-
 # =============================================================================
 # STATIC SETS (must match DB contents)
 # =============================================================================
@@ -104,41 +106,99 @@ SPECIALIZATIONS = {
 # =============================================================================
 
 def get_mysql_conn():
-    return mysql.connector.connect(**MYSQL_CONFIG)
+    # Shared pool from db.py (same one app.py uses)
+    return get_connection()
 
 # =============================================================================
 # GEMINI
 # =============================================================================
 
+# One long-lived client per process: deadlines, retries, concurrency cap and
+# circuit breaker are configured in llm_client.py (LLM_* env vars)
+GEMINI = GeminiClient(MODEL_NAME, GEMINI_API_KEY)
+
 def call_gemini(prompt: str) -> str:
-    model = genai.GenerativeModel(MODEL_NAME)
-    resp = model.generate_content(prompt)
-    return (resp.text or "").strip()
+    """Raises LLMUnavailable when Gemini is degraded; callers fall back to local data."""
+    return GEMINI.generate(prompt)
 
 # =============================================================================
 # SYMPTOM EXTRACTION
 # =============================================================================
 
-def extract_symptoms(user_input: str) -> Tuple[List[str], List[str]]:
-    prompt = f"""
-        You are an AI model that extracts symptoms from user input. Only return the extracted symptoms in a comma-separated
-        list, strictly matching the recognized symptoms.
+# Bump whenever the extraction prompt changes so stale cached answers are ignored
+EXTRACT_PROMPT_VERSION = "v2"
 
-        User Input: "{user_input}"
-        Recognized Symptoms: {', '.join(SYMPTOMS)}
-
-        **Rules**:
-        - Strictly adhere to the given set and match symptoms from there.
-        - Do not make symptoms on your own, those will not be recognized.
-        - ONLY return the final symptom list.
-        - DO NOT include explanations, thoughts, or analysis.
-        - If no symptoms match, return an empty string.
-        - Your response MUST start with [ and end with ].
-        - The response format is: [symptom1, symptom2, symptom3]
-        - FAIL IF YOU DON'T FOLLOW THE FORMAT.
+# Normalized user input -> (correct, wrong); see llm_cache.py for knobs
+SYMPTOM_CACHE = ResponseCache()
+
+# Local trie over SYMPTOMS + synonyms; answers without Gemini when it covers
+# at least this share of the meaningful words in the message
+LOCAL_MATCHER = SymptomMatcher(SYMPTOMS, SYNONYMS)
+LOCAL_MIN_COVERAGE = 0.6
+
+def extract_symptoms_locally(user_input: str) -> Optional[List[str]]:
+    """Returns symptoms if the local matcher is confident, else None."""
+    found, coverage, negated = LOCAL_MATCHER.match(user_input)
+    if found and not negated and coverage >= LOCAL_MIN_COVERAGE:
+        return found
+    return None
+
+# Fixed instructions first, then the vocabulary and the message. Only the
+# header is the same on every request: with the prefilter on, the vocabulary
+# block is the message's own top-K candidates, so it differs almost every time
+EXTRACT_PROMPT_HEADER = (
+    "Extract the symptoms the user reports having. Use only names from the vocabulary, "
+    "never invent new ones, and skip symptoms the user says they do not have. "
+    "Reply with the list only, e.g. [cough, high_fever], or [] if none match.\n"
+)
+SYMPTOM_VOCABULARY = sorted(SYMPTOMS)
+
+# Only list the symptoms a cheap fuzzy pass finds plausible (0 = always send all).
+# Messages whose words mostly don't resemble the vocabulary still get the full list.
+SYMPTOM_PREFILTER = SymptomPrefilter(SYMPTOMS, SYNONYMS)
+EXTRACT_PREFILTER_TOP_K = int(os.getenv("EXTRACT_PREFILTER_TOP_K", "40"))
+EXTRACT_PREFILTER_MIN_COVERAGE = float(os.getenv("EXTRACT_PREFILTER_MIN_COVERAGE", "0.5"))
+# The prompt depends on the prefilter settings too, so cached answers are keyed on them
+EXTRACT_CACHE_VERSION = f"{EXTRACT_PROMPT_VERSION}:k{EXTRACT_PREFILTER_TOP_K}:c{EXTRACT_PREFILTER_MIN_COVERAGE:g}"
+
+def build_extract_prompt(user_input: str) -> str:
+    vocabulary = SYMPTOM_VOCABULARY
+    if EXTRACT_PREFILTER_TOP_K > 0:
+        candidates, coverage = SYMPTOM_PREFILTER.candidates(user_input, EXTRACT_PREFILTER_TOP_K)
+        if candidates and coverage >= EXTRACT_PREFILTER_MIN_COVERAGE:
+            vocabulary = sorted(candidates)
+    return f'{EXTRACT_PROMPT_HEADER}Vocabulary: {",".join(vocabulary)}\nMessage: "{user_input}"\n'
+
+def extract_symptoms(
+    user_input: str,
+    on_llm_needed: Optional[Callable[[], None]] = None,
+) -> Tuple[List[str], List[str], str]:
+    """
+    Returns (recognized, unrecognized, source) where source says which path
+    answered: "local" (trie), "cache" (earlier Gemini answer), "llm", or
+    "fallback" (best-effort trie match while Gemini is unavailable).
+    on_llm_needed is called once both local paths have missed, just before
+    Gemini is asked.
     """
+    local = extract_symptoms_locally(user_input)
+    if local is not None:
+        return local, [], "local"
+
+    key = cache_key(user_input, EXTRACT_CACHE_VERSION)
+    cached = SYMPTOM_CACHE.get(key)
+    if cached is not None:
+        return cached["correct"], cached["wrong"], "cache"
+
+    if on_llm_needed is not None:
+        on_llm_needed()
+    prompt = build_extract_prompt(user_input)
 
-    content = call_gemini(prompt).lower()
+    try:
+        content = call_gemini(prompt).lower()
+    except LLMUnavailable as e:
+        print("Gemini unavailable, using local symptom matches:", e)
+        found, _, _ = LOCAL_MATCHER.match(user_input)
+        return found, [], "fallback"
     matches = re.findall(r"\[(.*?)\]", content)
     if matches:
         extracted = matches[-1].strip()
@@ -148,7 +208,8 @@ def extract_symptoms(user_input: str) -> Tuple[List[str], List[str]]:
 
     correct = [sym for sym in raw_list if sym in SYMPTOMS]
     wrong = [sym for sym in raw_list if sym not in SYMPTOMS]
-    return correct, wrong
+    SYMPTOM_CACHE.put(key, {"correct": correct, "wrong": wrong})
+    return correct, wrong, "llm"
 
 # =============================================================================
 # LEGACY SQL MATCHING (Fallback)
@@ -157,63 +218,16 @@ def extract_symptoms(user_input: str) -> Tuple[List[str], List[str]]:
 def match_diseases(user_symptoms: List[str], top_n: int = 2) -> List[Dict[str, Any]]:
     if not user_symptoms:
         return []
-
-    conn = get_mysql_conn()
-    try:
-        cursor = conn.cursor()
-        placeholders = ", ".join(["%s"] * len(user_symptoms))
-        sql = f"""
-            SELECT
-                d.disease_id,
-                d.disease_name,
-                GROUP_CONCAT(DISTINCT s.symptom_name) AS all_symptoms,
-                SUM(CASE WHEN s.symptom_name IN ({placeholders}) THEN 1 ELSE 0 END) AS match_count
-            FROM disease d
-            JOIN disease_symptom ds ON ds.disease_id = d.disease_id
-            JOIN symptom s ON s.symptom_id = ds.symptom_id
-            GROUP BY d.disease_id, d.disease_name
-            HAVING match_count > 0
-            ORDER BY match_count DESC
-            LIMIT %s
-        """
-        params = list(user_symptoms) + [top_n]
-        cursor.execute(sql, params)
-
-        results = []
-        for (did, dname, all_symptoms_str, match_count) in cursor.fetchall():
-            all_symptoms_list = all_symptoms_str.split(",") if all_symptoms_str else []
-            matched = sorted(set(all_symptoms_list).intersection(user_symptoms))
-            results.append({
-                "disease": dname,
-                "score": int(match_count),
-                "matched_symptoms": matched,
-                "all_symptoms": sorted(set(all_symptoms_list)),
-            })
-        return results
-    finally:
-        conn.close()
+    # In-memory inverted index (ontology.py), loaded once from the same tables
+    return get_symptom_index().match(user_symptoms, top_n=top_n)
 
 # =============================================================================
 # LOOKUPS
 # =============================================================================
 
 def get_specialization(disease: str) -> Optional[str]:
-    conn = get_mysql_conn()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s.specialty_name
-            FROM disease d
-            LEFT JOIN specialty s ON d.specialty_id = s.specialty_id
-            WHERE d.disease_name = %s
-            LIMIT 1
-        """, (disease,))
-        row = cursor.fetchone()
-        if row and row[0]:
-            return row[0].strip().upper()
-        return None
-    finally:
-        conn.close()
+    # Served from the in-memory disease -> specialty map in ontology.py
+    return get_specialty(disease)
 
 def format_phone(ph: Any) -> str:
     ph = "".join(filter(str.isdigit, str(ph)))
@@ -221,45 +235,126 @@ def format_phone(ph: Any) -> str:
         return f"+1({ph[:3]}){ph[3:7]}-{ph[7:11]}"
     return ph
 
-def get_doctors(specialization: str, city: Optional[str] = None, zipcode: Optional[str] = None) -> pd.DataFrame:
+DOCTOR_PAGE_SIZE = 10
+
+def _doctor_card(specialization: str, first: Any, last: Any, phone: Any, facility: Any,
+                 city: Any, state: Any, zip_code: Any) -> Dict[str, str]:
+    """Shape one doctor row the way the chat UI renders it."""
+    name = f"{str(first or '').strip()} {str(last or '').strip()}"
+    return {
+        "name": name.strip() or "Unknown name",
+        "specialty": specialization,
+        "facility": str(facility or "").strip(),
+        "phone": format_phone(phone) if phone else "",
+        "city": str(city or "").strip(),
+        "state": str(state or "").strip(),
+        "zip": str(zip_code or "").strip(),
+    }
+
+def get_doctors(
+    specialization: str,
+    city: Optional[str] = None,
+    zipcode: Optional[str] = None,
+    limit: int = DOCTOR_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of doctors for a specialty, optionally narrowed by city / ZIP.
+    Filters hit the normalized, indexed columns from
+    aloo-dump/doctor_search_indexes.sql and pages by doctor_id (keyset), so
+    deep pages in a big metro cost the same as the first one.
+    Returns {"doctors": [...], "next_cursor": <pass back for the next page or None>}.
+    """
+    sql = """
+        SELECT
+            d.doctor_id,
+            d.first_name,
+            d.last_name,
+            d.phone_number,
+            d.address_line1,
+            d.city,
+            d.state,
+            d.zip_code
+        FROM specialty s
+        JOIN doctor d ON d.specialty_id = s.specialty_id
+        WHERE s.specialty_name_norm = %s
+    """
+    params: List[Any] = [specialization.strip().upper()]
+
+    if city and city.strip():
+        sql += " AND d.city_norm = %s"
+        params.append(city.strip().upper())
+
+    if zipcode:
+        zip_prefix = str(zipcode).strip()[:5]
+        if zip_prefix:
+            sql += " AND d.zip5 = %s"
+            params.append(zip_prefix)
+
+    if cursor:
+        sql += " AND d.doctor_id > %s"
+        params.append(cursor)
+
+    # Fetch one extra row to learn whether another page exists
+    sql += " ORDER BY d.doctor_id LIMIT %s"
+    params.append(limit + 1)
+
     conn = get_mysql_conn()
     try:
-        cursor = conn.cursor()
-        base_sql = """
-            SELECT
-                d.first_name    AS FirstName,
-                d.last_name     AS LastName,
-                d.phone_number  AS Phone,
-                d.address_line1 AS Facility,
-                d.city          AS City,
-                d.state         AS State,
-                d.zip_code      AS ZIP
-            FROM doctor d
-            JOIN specialty s ON d.specialty_id = s.specialty_id
-            WHERE UPPER(s.specialty_name) = %s
-        """
-        params = [specialization.upper()]
-
-        if city:
-            base_sql += " AND UPPER(d.city) = %s"
-            params.append(city.upper())
-
-        if zipcode:
-            zip_prefix = str(zipcode).strip()[:5]
-            if zip_prefix:
-                base_sql += " AND LEFT(d.zip_code, 5) = %s"
-                params.append(zip_prefix)
-
-        cursor.execute(base_sql, params)
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        df = pd.DataFrame(rows, columns=columns)
-        if not df.empty:
-            df["Phone"] = df["Phone"].apply(format_phone)
-        return df
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
     finally:
         conn.close()
 
+    doctors = [
+        _doctor_card(specialization, first, last, phone, facility, d_city, state, zip_code)
+        for (_, first, last, phone, facility, d_city, state, zip_code) in rows[:limit]
+    ]
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return {"doctors": doctors, "next_cursor": next_cursor}
+
+def get_nearby_doctors(
+    specialization: str,
+    zipcode: str,
+    limit: int = DOCTOR_PAGE_SIZE,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Closest doctors of a specialty around a ZIP (doctor_geo.py), with distance.
+    None if the ZIP isn't in the centroid table, so callers can fall back to
+    get_doctors()'s exact match.
+    """
+    hits = find_nearest_doctors(specialization, zipcode, limit=limit)
+    if hits is None:
+        return None
+    doctors = []
+    for hit in hits:
+        card = _doctor_card(
+            specialization, hit["first_name"], hit["last_name"], hit["phone"],
+            hit["facility"], hit["city"], hit["state"], hit["zip"],
+        )
+        card["distance_miles"] = hit["distance_miles"]
+        doctors.append(card)
+    return doctors
+
+def lookup_doctors(
+    specialization: str,
+    city: Optional[str] = None,
+    zipcode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    First page for the chat reply: nearest-first when only a ZIP is given,
+    otherwise (or if the ZIP is unknown / nobody is in range) exact matching.
+    """
+    if zipcode and not city:
+        nearby = get_nearby_doctors(specialization, zipcode)
+        if nearby:
+            return {"doctors": nearby, "next_cursor": None, "mode": "nearby"}
+    page = get_doctors(specialization, city=city, zipcode=zipcode)
+    page["mode"] = "exact"
+    return page
+
 # =============================================================================
 # LLM DIAGNOSIS (Fallback)
 # =============================================================================
@@ -273,7 +368,11 @@ def get_llm_diagnosis(user_input: str) -> Optional[Dict[str, str]]:
         Format: {{"disease": "<disease_name>", "specialization": "<specialization_from_list>"}}
         FAIL if you do not follow this format.
     """
-    content = call_gemini(prompt)
+    try:
+        content = call_gemini(prompt)
+    except LLMUnavailable as e:
+        print("Gemini unavailable, skipping LLM diagnosis:", e)
+        return None
     match = re.search(r"\{.*?\}", content, re.DOTALL)
     if not match:
         return None
@@ -295,24 +394,171 @@ def get_llm_diagnosis(user_input: str) -> Optional[Dict[str, str]]:
 # CORE CHAT PIPELINE (The "AI" Integration)
 # =============================================================================
 
-def run_chat_pipeline(
+# "concurrent" overlaps the LLM diagnosis fallback with a Gemini extraction, "serial"
+# runs every stage in order. Extraction and the doctor lookup run in the request
+# thread either way: each depends on the stage before it, so there is nothing to
+# overlap them with, and the Gemini client and DB pool bound their latency.
+PIPELINE_MODE = os.getenv("CHAT_PIPELINE_MODE", "concurrent").lower()
+
+# Start the LLM diagnosis fallback alongside a Gemini extraction; dropped if the RF is confident.
+# Runs on its own small pool so it can't take every LLM slot, and is skipped
+# (never queued) while all of its workers are busy.
+SPECULATIVE_LLM_DIAGNOSIS = os.getenv("CHAT_SPECULATIVE_DIAGNOSIS", "1") == "1"
+SPECULATIVE_WORKERS = int(os.getenv("CHAT_SPECULATIVE_WORKERS", "2"))
+SPECULATIVE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, SPECULATIVE_WORKERS),
+    thread_name_prefix="chat-speculative",
+)
+_SPECULATIVE_SLOTS = threading.BoundedSemaphore(max(1, SPECULATIVE_WORKERS))
+
+# Seconds a pooled stage may take before we move on without it, counted from
+# when it starts running; one that never gets a worker gives up after the same time
+STAGE_DEADLINES = {
+    "llm_diagnosis": 20.0,
+}
+
+def _run_stage(stage: str, fn, *args: Any, **kwargs: Any) -> Any:
+    """Run one stage body under its latency timer (see metrics.py)."""
+    with stage_timer(stage):
+        return fn(*args, **kwargs)
+
+def _run_pooled_stage(started: threading.Event, started_at: List[float], stage: str, fn,
+                      *args: Any, **kwargs: Any) -> Any:
+    started_at.append(time.monotonic())
+    started.set()
+    return _run_stage(stage, fn, *args, **kwargs)
+
+def _submit_stage(stage: str, fn, *args: Any, **kwargs: Any) -> Future:
+    """_run_stage on the speculative pool, carrying the caller's request trace along."""
+    ctx = contextvars.copy_context()
+    started = threading.Event()
+    started_at: List[float] = []
+    future = SPECULATIVE_EXECUTOR.submit(ctx.run, _run_pooled_stage, started, started_at, stage, fn, *args, **kwargs)
+    # Cancelled before it ran: nothing will set it otherwise
+    future.add_done_callback(lambda _: started.set())
+    future.started, future.started_at = started, started_at
+    return future
+
+def _await_stage(future: Future, stage: str, default: Any) -> Any:
+    """Wait for a stage up to its deadline. Timeouts fall back to `default`; errors propagate."""
+    deadline = STAGE_DEADLINES[stage]
+    if not future.started.wait(timeout=deadline) or not future.started_at:
+        future.cancel()
+        print(f"Chat stage '{stage}' never started within {deadline}s")
+        return default
+    remaining = future.started_at[0] + deadline - time.monotonic()
+    try:
+        return future.result(timeout=max(remaining, 0.0))
+    except FutureTimeout:
+        # A running thread can't be interrupted; cancel() only stops queued work
+        future.cancel()
+        print(f"Chat stage '{stage}' missed its {deadline}s deadline")
+        return default
+
+class _SpeculativeDiagnosis:
+    """
+    The LLM diagnosis, started by extract_symptoms' on_llm_needed hook so it
+    only runs for messages the local matcher and the cache could not answer.
+    """
+
+    def __init__(self, user_input: str):
+        self.user_input = user_input
+        self.future: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        # No point starting it while the breaker is failing Gemini calls fast
+        if GEMINI.breaker.is_open() or not _SPECULATIVE_SLOTS.acquire(blocking=False):
+            return
+        with self._lock:
+            if self._closed:
+                _SPECULATIVE_SLOTS.release()
+                return
+            self.future = _submit_stage(
+                "llm_diagnosis", get_llm_diagnosis, self.user_input
+            )
+        self.future.add_done_callback(lambda _: _SPECULATIVE_SLOTS.release())
+
+    def close(self) -> Optional[Future]:
+        """Stop any later start() and return what was started, if anything."""
+        with self._lock:
+            self._closed = True
+            return self.future
+
+def iter_chat_pipeline(
     user_input: str,
     city: Optional[str] = None,
     zipcode: Optional[str] = None,
-) -> Dict[str, Any]:
+    concurrent: Optional[bool] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
     """
     End-to-End Pipeline:
     1. NLP Extraction (Gemini) -> Symptoms
     2. ML Inference (Random Forest) -> Predicted Disease
     3. Fallback to LLM or SQL if unsure
     4. Doctor Lookup
+
+    In concurrent mode, when (1) has to ask Gemini, the LLM fallback (3) is
+    started speculatively next to it, so a low-confidence request waits for
+    max(extract, diagnosis) instead of their sum. Local and cached
+    extractions never start it. The speculative call is cancelled when unused.
+
+    Yields (event, payload) as each stage finishes so callers can stream:
+    "symptoms", "predictions", "reply", "doctors", then "done" with the
+    full response (the same dict run_chat_pipeline returns).
     """
+    if concurrent is None:
+        concurrent = PIPELINE_MODE == "concurrent"
+
+    speculation: Optional[_SpeculativeDiagnosis] = None
+    if concurrent and SPECULATIVE_LLM_DIAGNOSIS:
+        speculation = _SpeculativeDiagnosis(user_input)
+    try:
+        yield from _chat_stages(user_input, city, zipcode, speculation)
+    finally:
+        # Also covers a streaming client that disconnects mid-pipeline
+        if speculation is not None:
+            started = speculation.close()
+            if started is not None:
+                started.cancel()
 
-    # 1. NLP Extraction
-    recognized, unrecognized = extract_symptoms(user_input)
+def _chat_stages(
+    user_input: str,
+    city: Optional[str],
+    zipcode: Optional[str],
+    speculation: Optional[_SpeculativeDiagnosis],
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stage bodies of iter_chat_pipeline."""
+
+    # 1. NLP Extraction (the speculative diagnosis, if any, starts from its hook)
+    recognized, unrecognized, extraction_source = _run_stage(
+        "extract", extract_symptoms, user_input,
+        on_llm_needed=speculation.start if speculation is not None else None,
+    )
+
+    yield "symptoms", {
+        "symptoms": recognized,
+        "unrecognized": unrecognized,
+        "extraction_source": extraction_source,
+    }
 
     # 2. AI Inference
-    ai_predictions = predict_disease_with_ai(recognized, top_n=3)
+    ai_predictions = _run_stage("predict", predict_disease_with_ai, recognized, top_n=3)
+
+    # Format for the UI list
+    formatted_likely_conditions = []
+    if ai_predictions:
+        formatted_likely_conditions = [
+            {
+                "name": p["disease"],
+                "score": f"{int(p['confidence']*100)}%",
+                "matched_symptoms": recognized
+            }
+            for p in ai_predictions
+        ]
+
+    yield "predictions", {"likely_conditions": formatted_likely_conditions}
 
     chosen_disease = None
     chosen_specialty = None
@@ -325,18 +571,31 @@ def run_chat_pipeline(
         chosen_disease = top_match['disease']
         confidence_score = top_match['confidence']
         # Map the predicted disease to a specialty using SQL
-        chosen_specialty = get_specialization(chosen_disease)
+        chosen_specialty = _run_stage("specialization", get_specialization, chosen_disease)
 
     # 4. Fallback: If AI is unsure (low confidence) or missed, ask the LLM directly
     llm_guess = None
     if not chosen_disease or confidence_score < 0.3:
-        llm_guess = get_llm_diagnosis(user_input)
+        speculative_llm = speculation.close() if speculation is not None else None
+        if speculative_llm is not None:
+            llm_guess = _await_stage(speculative_llm, "llm_diagnosis", None)
+        else:
+            llm_guess = _run_stage("llm_diagnosis", get_llm_diagnosis, user_input)
         if llm_guess:
             chosen_disease = llm_guess["disease"]
             chosen_specialty = llm_guess["specialization"]
             # Reset confidence display since this is a generation, not a prediction
             confidence_score = 0.0
 
+    # 5. Last resort (e.g. Gemini down): best symptom overlap from the ontology
+    overlap_match = None
+    if not chosen_disease and recognized:
+        overlaps = match_diseases(recognized, top_n=1)
+        if overlaps:
+            overlap_match = overlaps[0]
+            chosen_disease = overlap_match["disease"]
+            chosen_specialty = _run_stage("specialization", get_specialization, chosen_disease)
+
     # --- Build Response ---
 
     # A. Chat Bubble Response
@@ -359,26 +618,7 @@ def run_chat_pipeline(
     )
     assistant_reply = likely_part + spec_part + disclaimer
 
-    # B. Doctor Lookup
-    doctors_list = []
-    if chosen_specialty:
-        try:
-            df = get_doctors(chosen_specialty, city=city, zipcode=zipcode)
-            for _, row in df.head(10).iterrows():
-                name = f"{str(row.get('FirstName') or '').strip()} {str(row.get('LastName') or '').strip()}"
-                doctors_list.append({
-                    "name": name.strip() or "Unknown name",
-                    "specialty": chosen_specialty,
-                    "facility": str(row.get("Facility") or "").strip(),
-                    "phone": str(row.get("Phone") or "").strip(),
-                    "city": str(row.get("City") or "").strip(),
-                    "state": str(row.get("State") or "").strip(),
-                    "zip": str(row.get("ZIP") or "").strip(),
-                })
-        except Exception as e:
-            print("Doctor lookup failed:", e)
-
-    # C. Summary Panel
+    # B. Summary Panel
     sections = {}
     
     # Likely Condition Section
@@ -394,6 +634,11 @@ def run_chat_pipeline(
         why_lines.append(f"Matched {len(recognized)} symptom(s) from our clinical dataset.")
     elif llm_guess:
         why_lines.append(f"An AI clinical model suggested **{llm_guess['disease']}** based on your description.")
+    elif overlap_match:
+        why_lines.append(
+            f"Matched {overlap_match['score']} of {len(overlap_match['all_symptoms'])} known symptoms "
+            f"of **{overlap_match['disease']}** in our clinical dataset."
+        )
     else:
         why_lines.append("Insufficient data for a strong prediction.")
     sections["why"] = why_lines
@@ -407,82 +652,200 @@ def run_chat_pipeline(
 
     sections["disclaimer"] = "MediBuddy provides non-diagnostic information. Always consult a licensed professional."
 
-    # Format for the UI list
-    formatted_likely_conditions = []
-    if ai_predictions:
-        formatted_likely_conditions = [
-            {
-                "name": p["disease"],
-                "score": f"{int(p['confidence']*100)}%",
-                "matched_symptoms": recognized
-            }
-            for p in ai_predictions
-        ]
-
     summary = {
         "sections": sections,
         "likely_conditions": formatted_likely_conditions,
         "symptoms": recognized,
         "unrecognized": unrecognized,
+        "extraction_source": extraction_source,
     }
 
-    return {
+    yield "reply", {"assistant_reply": assistant_reply, "summary": summary}
+
+    # C. Doctor Lookup
+    doctors_list = []
+    doctors_next_cursor = None
+    doctors_mode = None
+    if chosen_specialty:
+        try:
+            page = _run_stage("doctors", lookup_doctors, chosen_specialty, city=city, zipcode=zipcode)
+            if page:
+                doctors_list = page["doctors"]
+                doctors_next_cursor = page["next_cursor"]
+                doctors_mode = page["mode"]
+        except Exception as e:
+            print("Doctor lookup failed:", e)
+
+    # Lets the UI request more pages from /chatbot/doctors
+    doctor_search = {
+        "specialty": chosen_specialty,
+        "city": city,
+        "zipcode": zipcode,
+        "next_cursor": doctors_next_cursor,
+        "mode": doctors_mode,
+    }
+    yield "doctors", {"doctors": doctors_list, "doctor_search": doctor_search}
+
+    yield "done", {
         "assistant_reply": assistant_reply,
         "summary": summary,
         "doctors": doctors_list,
+        "doctor_search": doctor_search,
     }
 
+def run_chat_pipeline(
+    user_input: str,
+    city: Optional[str] = None,
+    zipcode: Optional[str] = None,
+    concurrent: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Runs iter_chat_pipeline to completion and returns the full response."""
+    result: Dict[str, Any] = {}
+    for event, payload in iter_chat_pipeline(user_input, city=city, zipcode=zipcode, concurrent=concurrent):
+        if event == "done":
+            result = payload
+    return result
+
+# =============================================================================
+# WARM-UP
+# =============================================================================
+
+def warm_up() -> None:
+    """
+    Load everything the first chat request would otherwise pay for.
+    Model and ontology errors propagate (app.py's /ready reports them); the
+    geo index is optional since doctor lookups fall back to exact matching.
+    """
+    GEMINI.get_model()
+    ensure_model_loaded()
+    get_symptom_index()
+    get_specialty_map()
+    try:
+        get_doctor_geo_index()
+    except Exception as e:
+        print("Doctor geo index warm-up failed:", e)
+
 # =============================================================================
 # UPSERT HELPERS (For Admin/Setup)
 # =============================================================================
 
-def _get_or_create_specialty_id(cursor, specialty_name: str) -> str:
-    specialty_name = specialty_name.strip()
-    cursor.execute("SELECT specialty_id FROM specialty WHERE UPPER(specialty_name) = %s", (specialty_name.upper(),))
-    row = cursor.fetchone()
-    if row: return row[0]
-    sid = str(uuid.uuid4())
-    cursor.execute("INSERT INTO specialty (specialty_id, specialty_name) VALUES (%s, %s)", (sid, specialty_name))
-    return sid
-
-def _get_or_create_symptom_id(cursor, symptom_name: str) -> str:
-    symptom_name = symptom_name.strip()
-    cursor.execute("SELECT symptom_id FROM symptom WHERE symptom_name = %s", (symptom_name,))
-    row = cursor.fetchone()
-    if row: return row[0]
-    sym_id = str(uuid.uuid4())
-    cursor.execute("INSERT INTO symptom (symptom_id, symptom_name) VALUES (%s, %s)", (sym_id, symptom_name))
-    return sym_id
-
-def _get_or_create_disease_id(cursor, disease_name: str, specialty_id: Optional[str]) -> str:
-    disease_name = disease_name.strip()
-    cursor.execute("SELECT disease_id FROM disease WHERE disease_name = %s", (disease_name,))
-    row = cursor.fetchone()
-    if row:
-        disease_id = row[0]
-        if specialty_id is not None:
-            cursor.execute("UPDATE disease SET specialty_id = %s WHERE disease_id = %s", (specialty_id, disease_id))
-        return disease_id
-    disease_id = str(uuid.uuid4())
-    cursor.execute("INSERT INTO disease (disease_id, disease_name, specialty_id) VALUES (%s, %s, %s)", (disease_id, disease_name, specialty_id))
-    return disease_id
+# Names per IN (...) lookup and rows per multi-row INSERT
+ONTOLOGY_BATCH = 1000
+
+OntologyEntry = Tuple[str, str, List[str]]  # (disease, specialization, symptoms)
+
+
+def _clean_entries(entries: List[OntologyEntry]) -> List[Tuple[str, str, List[str]]]:
+    cleaned = []
+    for i, (disease, specialization, symptoms) in enumerate(entries):
+        disease, specialization = (disease or "").strip(), (specialization or "").strip()
+        if not disease or not specialization:
+            raise ValueError(f"entry {i}: disease and specialization must be non-empty")
+        clean_symptoms = [s.strip() for s in symptoms or [] if s and s.strip()]
+        if not clean_symptoms:
+            raise ValueError(f"entry {i}: symptoms list must contain at least one non-empty symptom")
+        cleaned.append((disease, specialization, clean_symptoms))
+    return cleaned
+
+
+def _fetch_ids(cursor, sql: str, names: List[str], key) -> Dict[str, str]:
+    """name key -> id for the given names, ONTOLOGY_BATCH names per query."""
+    ids: Dict[str, str] = {}
+    for i in range(0, len(names), ONTOLOGY_BATCH):
+        chunk = names[i:i + ONTOLOGY_BATCH]
+        cursor.execute(sql.format(", ".join(["%s"] * len(chunk))), chunk)
+        for row_id, name in cursor.fetchall():
+            ids.setdefault(key(name), row_id)
+    return ids
+
+
+def _executemany(cursor, sql: str, rows: List[Tuple]) -> None:
+    for i in range(0, len(rows), ONTOLOGY_BATCH):
+        cursor.executemany(sql, rows[i:i + ONTOLOGY_BATCH])
+
+
+def bulk_insert_disease_entries(entries: List[OntologyEntry]) -> Dict[str, int]:
+    """
+    Upsert many (disease, specialization, symptoms) entries in one transaction.
+
+    Existing specialty/disease/symptom ids are prefetched with one IN lookup per
+    table; only the missing rows are inserted, and every write is a
+    multi-row executemany. Names match case-insensitively like the table
+    collation; a disease that already exists is moved to the given specialty.
+    Later entries for the same disease win the specialty and add symptoms.
+    """
+    cleaned = _clean_entries(list(entries))
+    if not cleaned:
+        return {"specialties": 0, "diseases": 0, "symptoms": 0, "links": 0}
+
+    spec_key, name_key = (lambda n: n.strip().upper()), (lambda n: n.strip().lower())
+    diseases: Dict[str, Tuple[str, str]] = {}  # key -> (name, specialty key)
+    symptoms: Dict[str, str] = {}
+    links: Dict[str, set] = {}
+    for disease, spec, syms in cleaned:
+        d_key = name_key(disease)
+        diseases[d_key] = (diseases.get(d_key, (disease,))[0], spec_key(spec))
+        for sym in syms:
+            symptoms.setdefault(name_key(sym), sym)
+            links.setdefault(d_key, set()).add(name_key(sym))
+    # Only specialties some disease ends up pointing at
+    specialties = {spec_key(spec): spec for _, spec, _ in reversed(cleaned)}
+    specialties = {k: specialties[k] for _, k in diseases.values()}
 
-def insert_disease_entry(disease: str, specialization: str, symptoms: List[str]) -> None:
-    if not disease or not specialization: raise ValueError("disease and specialization must be non-empty")
-    clean_symptoms = [s.strip() for s in symptoms if s and s.strip()]
-    if not clean_symptoms: raise ValueError("symptoms list must contain at least one non-empty symptom")
     conn = get_mysql_conn()
     try:
+        conn.start_transaction()
         cursor = conn.cursor()
-        spec_id = _get_or_create_specialty_id(cursor, specialization)
-        disease_id = _get_or_create_disease_id(cursor, disease, spec_id)
-        for sym_name in clean_symptoms:
-            sym_id = _get_or_create_symptom_id(cursor, sym_name)
-            cursor.execute("""
-                INSERT INTO disease_symptom (disease_id, symptom_id)
-                VALUES (%s, %s)
-                ON DUPLICATE KEY UPDATE disease_id = disease_id
-            """, (disease_id, sym_id))
+
+        spec_ids = _fetch_ids(
+            cursor, "SELECT specialty_id, specialty_name FROM specialty WHERE UPPER(specialty_name) IN ({})",
+            list(specialties), spec_key,
+        )
+        disease_ids = _fetch_ids(
+            cursor, "SELECT disease_id, disease_name FROM disease WHERE disease_name IN ({})",
+            [name for name, _ in diseases.values()], name_key,
+        )
+        symptom_ids = _fetch_ids(
+            cursor, "SELECT symptom_id, symptom_name FROM symptom WHERE symptom_name IN ({})",
+            list(symptoms.values()), name_key,
+        )
+
+        new_specs = [(spec_ids.setdefault(k, str(uuid.uuid4())), name)
+                     for k, name in specialties.items() if k not in spec_ids]
+        new_symptoms = [(symptom_ids.setdefault(k, str(uuid.uuid4())), name)
+                        for k, name in symptoms.items() if k not in symptom_ids]
+        new_diseases = sum(1 for k in diseases if k not in disease_ids)
+        disease_rows = [(disease_ids.setdefault(k, str(uuid.uuid4())), name, spec_ids[s_key])
+                        for k, (name, s_key) in diseases.items()]
+        link_rows = [(disease_ids[d_key], symptom_ids[s_key])
+                     for d_key, sym_keys in links.items() for s_key in sorted(sym_keys)]
+
+        _executemany(cursor, "INSERT INTO specialty (specialty_id, specialty_name) VALUES (%s, %s)", new_specs)
+        _executemany(cursor, "INSERT INTO symptom (symptom_id, symptom_name) VALUES (%s, %s)", new_symptoms)
+        # Keyed on the prefetched/new disease_id: inserts new diseases, re-points existing ones
+        _executemany(cursor, """
+            INSERT INTO disease (disease_id, disease_name, specialty_id) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE specialty_id = VALUES(specialty_id)
+        """, disease_rows)
+        _executemany(cursor, """
+            INSERT INTO disease_symptom (disease_id, symptom_id) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE disease_id = disease_id
+        """, link_rows)
+        cursor.close()
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+    # After commit, so no reader caches pre-commit rows
+    invalidate_ontology()
+    # Refit in a child process; workers hot-swap the new model when it lands
+    request_retrain()
+    return {"specialties": len(new_specs), "diseases": new_diseases,
+            "symptoms": len(new_symptoms), "links": len(link_rows)}
+
+
+def insert_disease_entry(disease: str, specialization: str, symptoms: List[str]) -> None:
+    bulk_insert_disease_entries([(disease, specialization, symptoms)])
\ No newline at end of file
@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from metrics import record_db_query
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+# Credentials and pool limits live in config/api.env next to the Gemini key
+load_dotenv("config/api.env")
+
+MYSQL_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "localhost"),
+    "port": int(os.getenv("MYSQL_PORT", "3306")),
+    "user": os.getenv("MYSQL_USER", "root"),
+    "password": os.getenv("MYSQL_PASSWORD", "[PASSWORD]"),
+    "database": os.getenv("MYSQL_DATABASE", "[DATABASE_NAME]"),
+    "charset": "utf8mb4",
+    "use_unicode": True,
+}
+
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5.0"))
+# Idle connections older than this are pinged before being handed out
+POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30.0"))
+
+
+class PoolExhausted(RuntimeError):
+    """Raised when no connection frees up within the acquire timeout."""
+
+
+# =============================================================================
+# POOL
+# =============================================================================
+
+class TimedCursor:
+    """Cursor proxy that reports each statement's duration to metrics.py."""
+
+    def __init__(self, raw: Any):
+        self._raw = raw
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._raw.execute(*args, **kwargs)
+        finally:
+            record_db_query(time.perf_counter() - start)
+
+    def executemany(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._raw.executemany(*args, **kwargs)
+        finally:
+            record_db_query(time.perf_counter() - start)
+
+    def __enter__(self) -> "TimedCursor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._raw.close()
+
+
+class PooledConnection:
+    """
+    Thin proxy around a mysql.connector connection.
+    Behaves like the real connection, except close() hands it back to the pool
+    and cursors are wrapped in TimedCursor.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: Any):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name: str) -> Any:
+        if self._raw is None:
+            raise RuntimeError("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args: Any, **kwargs: Any) -> TimedCursor:
+        if self._raw is None:
+            raise RuntimeError("Connection already returned to the pool")
+        return TimedCursor(self._raw.cursor(*args, **kwargs))
+
+    def close(self) -> None:
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        self._pool._release(raw)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections shared by app.py and chatbot.py.
+
+    - at most `max_size` connections exist at once (idle + checked out)
+    - acquire() waits up to `acquire_timeout` seconds, then raises PoolExhausted
+    - idle connections are pinged on checkout and replaced if dead
+    - open transactions are rolled back on release so no snapshot leaks
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        max_size: int = POOL_MAX_SIZE,
+        acquire_timeout: float = POOL_ACQUIRE_TIMEOUT,
+        ping_interval: float = POOL_PING_INTERVAL,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.config = dict(config)
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (raw_conn, last_returned_at)
+        self._size = 0  # connections that exist right now
+
+        # Counters (read through stats())
+        self._acquired = 0
+        self._created = 0
+        self._discarded = 0
+        self._exhausted = 0
+        self._health_check_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self) -> Any:
+        return mysql.connector.connect(**self.config)
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+
+        while True:
+            raw = None
+            last_used = 0.0
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._exhausted += 1
+                        raise PoolExhausted(
+                            f"No DB connection available after {timeout:.1f}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                else:
+                    # Reserve a slot, connect outside the lock
+                    self._size += 1
+
+            if raw is None:
+                try:
+                    raw = self._connect()
+                except Exception:
+                    self._drop_slot()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif time.monotonic() - last_used >= self.ping_interval and not self._is_alive(raw):
+                with self._cond:
+                    self._health_check_failures += 1
+                self._discard(raw)
+                continue
+
+            waited = time.perf_counter() - start
+            with self._cond:
+                self._acquired += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return PooledConnection(self, raw)
+
+    def _is_alive(self, raw: Any) -> bool:
+        try:
+            return raw.is_connected()
+        except Exception:
+            return False
+
+    def _release(self, raw: Any) -> None:
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, raw: Any) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._discarded += 1
+        self._drop_slot()
+
+    def _drop_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        """Close every idle connection (checked-out ones close on release)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "acquired": self._acquired,
+                "created": self._created,
+                "discarded": self._discarded,
+                "exhausted": self._exhausted,
+                "health_check_failures": self._health_check_failures,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+# =============================================================================
+# SHARED POOL
+# =============================================================================
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ConnectionPool(MYSQL_CONFIG)
+    return _POOL
+
+
+def get_connection(timeout: Optional[float] = None) -> PooledConnection:
+    """Check out a pooled connection. Call .close() to give it back."""
+    return get_pool().acquire(timeout)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
@@ -0,0 +1,207 @@
+import csv
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from db import get_connection
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+# ZIP -> centroid table shipped with the repo (see data/README.md)
+ZIP_CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "us_zip_centroids.csv")
+
+EARTH_RADIUS_MILES = 3958.8
+DEFAULT_RADIUS_MILES = float(os.getenv("DOCTOR_SEARCH_RADIUS_MILES", "25"))
+# Doctors are edited outside the app too (EditDoctor procedure), so reload periodically
+GEO_INDEX_TTL = float(os.getenv("DOCTOR_GEO_INDEX_TTL", "900"))
+
+# =============================================================================
+# ZIP CENTROIDS
+# =============================================================================
+
+_CENTROIDS: Optional[Dict[str, Tuple[float, float]]] = None
+_CENTROIDS_LOCK = threading.Lock()
+
+
+def load_zip_centroids(path: str = ZIP_CENTROIDS_PATH) -> Dict[str, Tuple[float, float]]:
+    with open(path, newline="") as fh:
+        return {row["zip"]: (float(row["lat"]), float(row["lon"])) for row in csv.DictReader(fh)}
+
+
+def get_zip_centroids() -> Dict[str, Tuple[float, float]]:
+    global _CENTROIDS
+    if _CENTROIDS is None:
+        with _CENTROIDS_LOCK:
+            if _CENTROIDS is None:
+                _CENTROIDS = load_zip_centroids()
+    return _CENTROIDS
+
+
+def zip_location(zipcode: Optional[str]) -> Optional[Tuple[float, float]]:
+    zip5 = str(zipcode or "").strip()[:5]
+    return get_zip_centroids().get(zip5) if zip5 else None
+
+# =============================================================================
+# PER-SPECIALTY INDEX
+# =============================================================================
+
+class DoctorGeoIndex:
+    """
+    One haversine BallTree per specialty over doctor ZIP centroids.
+    Doctors whose ZIP isn't in the centroid table are left out.
+    """
+
+    def __init__(self, rows: Iterable[Tuple], centroids: Dict[str, Tuple[float, float]]):
+        # rows: (specialty_norm, doctor_id, first, last, phone, facility, city, state, zip5)
+        grouped: Dict[str, Tuple[List[Tuple], List[Tuple[float, float]]]] = {}
+        for row in rows:
+            specialty, zip5 = row[0], row[8]
+            location = centroids.get(str(zip5 or "")[:5])
+            if not specialty or location is None:
+                continue
+            records, points = grouped.setdefault(specialty, ([], []))
+            records.append(row[1:])
+            points.append(location)
+
+        self._by_specialty: Dict[str, Tuple[BallTree, List[Tuple]]] = {}
+        for specialty, (records, points) in grouped.items():
+            tree = BallTree(np.radians(np.array(points)), metric="haversine")
+            self._by_specialty[specialty] = (tree, records)
+
+    def nearest(
+        self,
+        specialty: str,
+        location: Tuple[float, float],
+        limit: int = 10,
+        radius_miles: float = DEFAULT_RADIUS_MILES,
+    ) -> List[Tuple[float, Tuple]]:
+        """(distance_miles, record) pairs, closest first, capped at radius_miles."""
+        entry = self._by_specialty.get(specialty.strip().upper())
+        if entry is None or limit <= 0:
+            return []
+        tree, records = entry
+        k = min(limit, len(records))
+        dist, idx = tree.query(np.radians([location]), k=k)
+        miles = dist[0] * EARTH_RADIUS_MILES
+        return [(float(m), records[i]) for m, i in zip(miles, idx[0]) if m <= radius_miles]
+
+
+def load_doctor_geo_index() -> DoctorGeoIndex:
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.specialty_name_norm, d.doctor_id, d.first_name, d.last_name,
+                   d.phone_number, d.address_line1, d.city, d.state, d.zip5
+            FROM doctor d
+            JOIN specialty s ON d.specialty_id = s.specialty_id
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return DoctorGeoIndex(rows, get_zip_centroids())
+
+# =============================================================================
+# SHARED INSTANCE
+# =============================================================================
+
+_INDEX: Optional[DoctorGeoIndex] = None
+_INDEX_LOADED_AT = 0.0
+_INDEX_LOCK = threading.Lock()
+_REBUILDING = False
+
+
+def _rebuild_in_background() -> None:
+    global _INDEX, _INDEX_LOADED_AT, _REBUILDING
+    try:
+        index = load_doctor_geo_index()
+        with _INDEX_LOCK:
+            _INDEX = index
+            _INDEX_LOADED_AT = time.monotonic()
+    except Exception as e:
+        print("Doctor geo index reload failed:", e)
+        with _INDEX_LOCK:
+            # Keep serving the old index (if any); try again after another TTL
+            _INDEX_LOADED_AT = time.monotonic()
+    finally:
+        _REBUILDING = False
+
+
+def _start_rebuild() -> None:
+    global _REBUILDING
+    with _INDEX_LOCK:
+        if _REBUILDING:
+            return
+        _REBUILDING = True
+    threading.Thread(target=_rebuild_in_background, name="doctor-geo-rebuild", daemon=True).start()
+
+
+def get_doctor_geo_index(wait: bool = True) -> Optional[DoctorGeoIndex]:
+    """
+    Shared index. With wait=True (chatbot.warm_up) the first call loads it in
+    the caller's thread. With wait=False (request path) a missing index is
+    built on a daemon thread and None is returned meanwhile. Once it is older
+    than GEO_INDEX_TTL it is rebuilt in the background, and callers keep using
+    the old one until the new one is swapped in.
+    """
+    global _INDEX, _INDEX_LOADED_AT
+    index = _INDEX
+    if index is None:
+        if not wait:
+            _start_rebuild()
+            return None
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = load_doctor_geo_index()
+                _INDEX_LOADED_AT = time.monotonic()
+            return _INDEX
+
+    if time.monotonic() - _INDEX_LOADED_AT > GEO_INDEX_TTL and not _REBUILDING:
+        _start_rebuild()
+    return index
+
+
+def find_nearest_doctors(
+    specialty: str,
+    zipcode: str,
+    limit: int = 10,
+    radius_miles: float = DEFAULT_RADIUS_MILES,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Nearest doctors of a specialty around a ZIP centroid, closest first.
+    Returns None when the ZIP is unknown, the centroid table or index can't
+    be loaded, or the index is still being built (caller should fall back to
+    exact matching).
+    """
+    try:
+        location = zip_location(zipcode)
+        if location is None:
+            return None
+        index = get_doctor_geo_index(wait=False)
+    except Exception as e:
+        print("Doctor geo index unavailable:", e)
+        return None
+    if index is None:
+        return None
+    hits = index.nearest(specialty, location, limit=limit, radius_miles=radius_miles)
+    return [
+        {
+            "doctor_id": doctor_id,
+            "first_name": first,
+            "last_name": last,
+            "phone": phone,
+            "facility": facility,
+            "city": city,
+            "state": state,
+            "zip": zip5,
+            "distance_miles": round(miles, 1),
+        }
+        for miles, (doctor_id, first, last, phone, facility, city, state, zip5) in hits
+    ]
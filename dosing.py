@@ -0,0 +1,190 @@
+import datetime
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+# Clock times used when a frequency only says how often, not when
+DEFAULT_DOSE_TIMES = {
+    1: ("09:00",),
+    2: ("09:00", "21:00"),
+    3: ("08:00", "14:00", "20:00"),
+    4: ("08:00", "12:00", "16:00", "20:00"),
+}
+MORNING, EVENING, BEDTIME = "08:00", "18:00", "22:00"
+# First dose of an "every N hours" schedule that does not divide the day evenly
+INTERVAL_ANCHOR = "08:00"
+
+_WORD_NUMBERS = {"one": 1, "once": 1, "two": 2, "twice": 2, "three": 3, "thrice": 3, "four": 4,
+                 "five": 5, "six": 6, "eight": 8, "twelve": 12, "other": 2}
+_LATIN_PER_DAY = {"qd": 1, "od": 1, "bid": 2, "tid": 3, "qid": 4}
+_LATIN_RE = re.compile(r"\b(" + "|".join(_LATIN_PER_DAY) + r")\b")
+# Time-of-day words, checked before the counts so "once daily at bedtime" lands at BEDTIME
+_TIME_OF_DAY = (
+    (re.compile(r"\b(bed|bedtime|night|nightly|qhs|hs)\b"), BEDTIME),
+    (re.compile(r"\b(evening|supper|dinner)\b"), EVENING),
+    (re.compile(r"\b(morning|breakfast|am)\b"), MORNING),
+)
+
+
+class Frequency:
+    """
+    A parsed prescription.frequency.
+    Doses fall on `times` every `every_days` days, or every `interval_hours`
+    from INTERVAL_ANCHOR when the interval does not fit a day evenly.
+    As-needed medication has no schedule.
+    """
+
+    __slots__ = ("text", "times", "every_days", "interval_hours", "as_needed")
+
+    def __init__(self, text: str, times: Tuple[datetime.time, ...] = (), every_days: int = 1,
+                 interval_hours: Optional[float] = None, as_needed: bool = False):
+        self.text = text
+        self.times = times
+        self.every_days = every_days
+        self.interval_hours = interval_hours
+        self.as_needed = as_needed
+
+    @property
+    def doses_per_day(self) -> float:
+        if self.as_needed:
+            return 0.0
+        if self.interval_hours:
+            return 24.0 / self.interval_hours
+        return len(self.times) / self.every_days
+
+    def __repr__(self) -> str:
+        return f"Frequency({self.text!r}, {self.doses_per_day:g}/day)"
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+
+
+def _clock(*values: str) -> Tuple[datetime.time, ...]:
+    return tuple(sorted(datetime.time.fromisoformat(v) for v in values))
+
+
+def _count(token: str) -> Optional[int]:
+    if token.isdigit():
+        return int(token)
+    return _WORD_NUMBERS.get(token)
+
+
+def _per_day(text: str, n: int) -> Optional[Frequency]:
+    if n <= 0 or n > 24:
+        return None
+    if n in DEFAULT_DOSE_TIMES:
+        return Frequency(text, _clock(*DEFAULT_DOSE_TIMES[n]))
+    return _every_hours(text, 24 / n)
+
+
+def _at_times_of_day(freq: Optional[Frequency], text: str, times: List[str]) -> Optional[Frequency]:
+    """Move a day-based schedule onto the named times of day when the counts agree."""
+    if not times:
+        return freq
+    if freq is None:
+        return Frequency(text, _clock(*times))
+    if freq.as_needed or freq.interval_hours or len(freq.times) != len(times):
+        return freq
+    return Frequency(text, _clock(*times), every_days=freq.every_days)
+
+
+def _every_hours(text: str, hours: float) -> Optional[Frequency]:
+    if hours <= 0:
+        return None
+    if hours >= 24 and hours % 24 == 0:
+        return Frequency(text, _clock(DEFAULT_DOSE_TIMES[1][0]), every_days=int(hours // 24))
+    if 24 % hours == 0:
+        step = datetime.timedelta(hours=hours)
+        start = datetime.datetime.combine(datetime.date.min, datetime.time.fromisoformat(INTERVAL_ANCHOR))
+        count = int(24 // hours)
+        return Frequency(text, tuple(sorted((start + i * step).time() for i in range(count))))
+    return Frequency(text, interval_hours=hours)
+
+
+@lru_cache(maxsize=1024)
+def parse_frequency(text: Optional[str]) -> Optional[Frequency]:
+    """
+    Understands the free-text forms people type into prescription.frequency:
+    "Once daily", "twice a day", "bid", "3x daily", "every 8 hours", "q6h",
+    "every other day", "weekly", "before bed", "as needed", "BID with meals",
+    "once daily at bedtime" ...
+    Time-of-day words place the doses when the count matches ("twice daily
+    morning and evening"). Returns None for anything it cannot read.
+    """
+    if not text:
+        return None
+    s = re.sub(r"[_\-/.,]+", " ", text.lower()).strip()
+    s = re.sub(r"\s+", " ", s)
+    s = re.sub(r"(\d)x\b", r"\1 x", s)  # "3x daily" -> "3 x daily"
+
+    if re.search(r"\b(as needed|when needed|if needed|prn)\b", s):
+        return Frequency(text, as_needed=True)
+    times_of_day = [clock for pattern, clock in _TIME_OF_DAY if pattern.search(s)]
+    return _at_times_of_day(_parse_schedule(text, s), text, times_of_day)
+
+
+def _parse_schedule(text: str, s: str) -> Optional[Frequency]:
+    """How often, from the normalized text; time-of-day words are applied by the caller."""
+    m = re.search(r"\bq ?(\d+(?:\.\d+)?) ?(h|hr|hrs|hours?)\b", s)
+    if m:
+        return _every_hours(text, float(m.group(1)))
+    m = re.search(r"every (\w+) (hours?|hrs?|days?|weeks?)\b", s)
+    if m:
+        n = _count(m.group(1))
+        if n is None:
+            return None
+        unit = m.group(2)[0]
+        if unit == "h":
+            return _every_hours(text, n)
+        return Frequency(text, _clock(DEFAULT_DOSE_TIMES[1][0]), every_days=n * (7 if unit == "w" else 1))
+    if re.search(r"\b(every other day|alternate days|qod)\b", s):
+        return Frequency(text, _clock(DEFAULT_DOSE_TIMES[1][0]), every_days=2)
+    if re.search(r"\b(weekly|once a week|every week|qw)\b", s):
+        return Frequency(text, _clock(DEFAULT_DOSE_TIMES[1][0]), every_days=7)
+
+    m = _LATIN_RE.search(s)
+    if m:
+        return _per_day(text, _LATIN_PER_DAY[m.group(1)])
+    m = re.search(r"\b(\w+) ?(?:x|times?)? (?:a|per|each|every)? ?(?:day|daily)\b", s)
+    if m and _count(m.group(1)) is not None:
+        return _per_day(text, _count(m.group(1)))
+    m = re.fullmatch(r"(\d+) ?x(?: a day)?", s)
+    if m:
+        return _per_day(text, int(m.group(1)))
+
+    if re.search(r"\b(daily|every day|a day|per day)\b", s):
+        return _per_day(text, 1)
+    return None
+
+
+# =============================================================================
+# EXPANSION
+# =============================================================================
+
+
+def expand_schedule(frequency: Frequency, start: datetime.date, days: int) -> List[datetime.datetime]:
+    """Dose times (wall clock) on the `days` days starting at `start`, in order."""
+    if frequency.as_needed or days <= 0:
+        return []
+    end = datetime.datetime.combine(start + datetime.timedelta(days=days), datetime.time.min)
+
+    if frequency.interval_hours:
+        step = datetime.timedelta(hours=frequency.interval_hours)
+        current = datetime.datetime.combine(start, datetime.time.fromisoformat(INTERVAL_ANCHOR))
+        out = []
+        while current < end:
+            out.append(current)
+            current += step
+        return out
+
+    return [
+        datetime.datetime.combine(start + datetime.timedelta(days=offset), t)
+        for offset in range(0, days, frequency.every_days)
+        for t in frequency.times
+    ]
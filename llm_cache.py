@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+load_dotenv("config/api.env")
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+# Empty -> memory only. Set to e.g. "cache/llm_cache.sqlite3" to survive restarts
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+# Most rows kept in the SQLite file (oldest-expiring dropped first)
+LLM_CACHE_DISK_ROWS = int(os.getenv("LLM_CACHE_DISK_ROWS", str(16 * LLM_CACHE_SIZE)))
+# Expired / excess rows are purged on startup and every this many puts
+LLM_CACHE_PURGE_EVERY = int(os.getenv("LLM_CACHE_PURGE_EVERY", "500"))
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_input(text: str) -> str:
+    """'I have a Headache,  and fever!' -> 'i have a headache and fever'"""
+    text = _PUNCT.sub(" ", (text or "").lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def cache_key(user_input: str, prompt_version: str) -> str:
+    raw = f"{prompt_version}\x00{normalize_input(user_input)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class ResponseCache:
+    """
+    Bounded LRU cache with a TTL for JSON-serializable LLM results.
+    With `path` set, entries are also written to SQLite and read back on a
+    memory miss, so a restarted worker starts warm. The file is bounded too:
+    expired rows and anything past `max_disk_rows` are purged on open and
+    every `purge_every` puts.
+    """
+
+    def __init__(self, max_size: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, path: str = LLM_CACHE_PATH,
+                 max_disk_rows: int = LLM_CACHE_DISK_ROWS, purge_every: int = LLM_CACHE_PURGE_EVERY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path or None
+        self.max_disk_rows = max_disk_rows
+        self.purge_every = max(1, purge_every)
+        self._puts_since_purge = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.purged = 0
+
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires_at)")
+            with self._lock:
+                self._purge_disk(time.time())
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        payload = json.dumps(value)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, payload, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at),
+                )
+                self._puts_since_purge += 1
+                if self._puts_since_purge >= self.purge_every:
+                    self._purge_disk(time.time())
+                self._db.commit()
+
+    def _purge_disk(self, now: float) -> None:
+        """Drop expired rows, then the soonest-expiring ones past max_disk_rows. Caller holds the lock."""
+        self._puts_since_purge = 0
+        deleted = self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        excess = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_disk_rows
+        if excess > 0:
+            deleted += self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._db.commit()
+        self.purged += max(deleted, 0)
+
+    def _store(self, key: str, payload: str, expires_at: float) -> None:
+        # Caller holds the lock
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "purged": self.purged,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
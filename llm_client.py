@@ -0,0 +1,226 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from metrics import record_llm_call
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+load_dotenv("config/api.env")
+
+# Total seconds one generate() may take, including retries and waiting for a slot
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.25"))
+# Gemini calls in flight across all request threads
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Consecutive failed calls that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# e.g. http://127.0.0.1:8099 to talk REST to a local fake server instead of Google
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+
+
+class LLMUnavailable(RuntimeError):
+    """Gemini is degraded (breaker open, no free slot, or retries exhausted); use a local fallback."""
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `threshold` consecutive failures open it
+    open      -> calls are rejected until `cooldown` seconds have passed
+    half_open -> a single probe call decides between closed and open
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() < self._opened_at + self.cooldown
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() >= self._opened_at + self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+
+_TRANSIENT: Optional[tuple] = None
+
+
+def _transient_errors() -> tuple:
+    """Errors worth retrying: timeouts, dropped connections, 429 and 5xx."""
+    global _TRANSIENT
+    if _TRANSIENT is None:
+        errors = [TimeoutError, ConnectionError]
+        try:
+            from google.api_core import exceptions as gexc
+            errors += [
+                gexc.DeadlineExceeded, gexc.ServiceUnavailable, gexc.TooManyRequests,
+                gexc.ResourceExhausted, gexc.InternalServerError, gexc.BadGateway, gexc.GatewayTimeout,
+            ]
+        except ImportError:
+            pass
+        try:
+            import requests
+            errors += [requests.exceptions.ConnectionError, requests.exceptions.Timeout]
+        except ImportError:
+            pass
+        _TRANSIENT = tuple(errors)
+    return _TRANSIENT
+
+
+class GeminiClient:
+    """
+    Long-lived Gemini wrapper shared by all request threads.
+    The GenerativeModel is built once; every generate() call gets a deadline,
+    jittered retries on transient errors, a slot from a global semaphore, and
+    goes through a circuit breaker that fails fast with LLMUnavailable.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        api_key: Optional[str],
+        endpoint: str = GEMINI_API_ENDPOINT,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get_model(self) -> Any:
+        """Import and configure google-generativeai once, on first use."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    if self.endpoint:
+                        genai.configure(
+                            api_key=self.api_key or "local",
+                            transport="rest",
+                            client_options={"api_endpoint": self.endpoint},
+                        )
+                    else:
+                        genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str) -> str:
+        if self.breaker.is_open():
+            self.breaker.rejected += 1
+            record_llm_call(0.0, "rejected")
+            raise LLMUnavailable("Gemini circuit breaker is open")
+
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            record_llm_call(0.0, "rejected")
+            raise LLMUnavailable("No free Gemini slot before the deadline")
+        try:
+            if not self.breaker.allow():
+                record_llm_call(0.0, "rejected")
+                raise LLMUnavailable("Gemini circuit breaker is open")
+            return self._generate_with_retries(prompt, deadline)
+        finally:
+            self._slots.release()
+
+    def _generate_with_retries(self, prompt: str, deadline: float) -> str:
+        model = self.get_model()
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            start = time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise TimeoutError("Gemini deadline exceeded")
+                # retry=None turns off the SDK's own retry (up to 600s on 503); we retry here
+                resp = model.generate_content(prompt, request_options={"timeout": remaining, "retry": None})
+            except _transient_errors() as e:
+                record_llm_call(time.perf_counter() - start, "error")
+                # Full jitter keeps many workers from retrying in lockstep
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                attempt += 1
+                if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"Gemini failed after {attempt} attempt(s): {e!r}") from e
+                time.sleep(delay)
+                continue
+            except Exception:
+                # A bad request or blocked prompt still means the service is up
+                record_llm_call(time.perf_counter() - start, "error")
+                self.breaker.record_success()
+                raise
+
+            usage = getattr(resp, "usage_metadata", None)
+            record_llm_call(
+                time.perf_counter() - start,
+                "ok",
+                prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+                completion_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            )
+            self.breaker.record_success()
+            return (resp.text or "").strip()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker_open": int(self.breaker.state == CircuitBreaker.OPEN),
+            "consecutive_failures": self.breaker.failures,
+            "breaker_opened": self.breaker.opened,
+            "rejected": self.breaker.rejected,
+        }
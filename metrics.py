@@ -0,0 +1,172 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+# Latency buckets in seconds (Prometheus "le" bounds)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS: Dict[str, Tuple[str, str]] = {
+    "medibuddy_chat_stage_seconds": ("histogram", "Time spent in each chat pipeline stage."),
+    "medibuddy_chat_stage_errors_total": ("counter", "Chat pipeline stages that raised."),
+    "medibuddy_db_query_seconds": ("histogram", "MySQL statement execution time."),
+    "medibuddy_llm_call_seconds": ("histogram", "Gemini generate_content latency."),
+    "medibuddy_llm_calls_total": ("counter", "Gemini calls by outcome."),
+    "medibuddy_llm_tokens_total": ("counter", "Gemini tokens by kind (prompt / completion)."),
+    "medibuddy_reminders_total": ("counter", "Reminder deliveries by outcome (delivered / failed)."),
+}
+
+_LOCK = threading.Lock()
+_COUNTERS: Dict[Tuple[str, Tuple], float] = {}
+_HISTOGRAMS: Dict[Tuple[str, Tuple], List[Any]] = {}  # -> [bucket_counts, sum, count]
+
+
+def _labels(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels: Any) -> None:
+    key = (name, _labels(labels))
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    key = (name, _labels(labels))
+    with _LOCK:
+        hist = _HISTOGRAMS.get(key)
+        if hist is None:
+            hist = _HISTOGRAMS[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[0][i] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+def _fmt_labels(labels: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = list(labels) + list(extra or ())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render(gauges: Optional[Dict[str, Tuple[str, Dict[str, float]]]] = None) -> str:
+    """
+    Prometheus text exposition of everything recorded so far.
+    `gauges` adds point-in-time values: {name: (help, {label_value_or_"": value})}.
+    """
+    lines: List[str] = []
+    with _LOCK:
+        counters = dict(_COUNTERS)
+        histograms = {k: [list(v[0]), v[1], v[2]] for k, v in _HISTOGRAMS.items()}
+
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+        else:
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, bucket_count in zip(BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', f'{bound:g}'),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    for name, (help_text, values) in (gauges or {}).items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for label, value in values.items():
+            suffix = "{" + label + "}" if label else ""
+            lines.append(f"{name}{suffix} {value:g}")
+
+    return "\n".join(lines) + "\n"
+
+# =============================================================================
+# PER-REQUEST TRACE (debug mode)
+# =============================================================================
+
+# Set for the duration of one chat request; copied into pipeline worker threads
+_TRACE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("medibuddy_trace", default=None)
+_TRACE_LOCK = threading.Lock()
+
+
+def _new_trace() -> Dict[str, Any]:
+    return {
+        "stages": {},
+        "db": {"queries": 0, "seconds": 0.0},
+        "llm": {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0},
+    }
+
+
+def start_trace() -> Dict[str, Any]:
+    """Trace the rest of the current context (scripts); request handlers use request_trace()."""
+    trace = _new_trace()
+    _TRACE.set(trace)
+    return trace
+
+
+@contextmanager
+def request_trace() -> Iterator[Dict[str, Any]]:
+    """Trace one request and unset it afterwards, so a reused worker thread starts clean."""
+    trace = _new_trace()
+    token = _TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _TRACE.reset(token)
+
+
+def _add_to_trace(section: str, **values: float) -> None:
+    trace = _TRACE.get()
+    if trace is None:
+        return
+    with _TRACE_LOCK:
+        bucket = trace[section]
+        for key, value in values.items():
+            bucket[key] = round(bucket.get(key, 0) + value, 6)
+
+# =============================================================================
+# RECORDING HELPERS
+# =============================================================================
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("medibuddy_chat_stage_errors_total", stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("medibuddy_chat_stage_seconds", elapsed, stage=stage)
+        _add_to_trace("stages", **{stage: elapsed})
+
+
+def record_db_query(seconds: float) -> None:
+    observe("medibuddy_db_query_seconds", seconds)
+    _add_to_trace("db", queries=1, seconds=seconds)
+
+
+def record_llm_call(seconds: float, status: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    observe("medibuddy_llm_call_seconds", seconds)
+    inc("medibuddy_llm_calls_total", status=status)
+    if prompt_tokens:
+        inc("medibuddy_llm_tokens_total", prompt_tokens, kind="prompt")
+    if completion_tokens:
+        inc("medibuddy_llm_tokens_total", completion_tokens, kind="completion")
+    _add_to_trace(
+        "llm", calls=1, seconds=seconds,
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+    )
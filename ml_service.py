@@ -1,49 +1,404 @@
-import joblib
 import os
+import queue
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
 import numpy as np
 
-# Load model artifacts once when the server starts
-# We use try/except so the app doesn't crash if you haven't run train_model.py yet
-try:
-    MODEL = joblib.load('model_forest.pkl')
-    ENCODER = joblib.load('model_encoder.pkl')
+COMPACT_MODEL_PATH = 'model_forest.npz'
+
+
+def load_npz_mmap(path):
+    """
+    np.load can't memory-map members of an .npz, so do it by hand: np.savez
+    stores members uncompressed, so each .npy payload sits at a fixed offset
+    in the zip and can be np.memmap'ed directly. Pages are then shared
+    between worker processes through the OS page cache.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as fh:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            # Local file header: 30 fixed bytes, then file name and extra field
+            fh.seek(info.header_offset)
+            header = fh.read(30)
+            name_len, extra_len = struct.unpack('<HH', header[26:30])
+            fh.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(fh)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode='r', shape=shape,
+                order='F' if fortran_order else 'C', offset=fh.tell(),
+            )
+    return arrays
+
+
+class CompactForest:
+    """
+    Pure-NumPy stand-in for the RandomForestClassifier, built from the
+    flattened arrays written by train_model.export_compact_model.
+    predict_proba walks all trees for all rows level by level and averages
+    the leaf class distributions, matching sklearn's predict_proba.
+    Leaves are marked by a negative children_left: -1 - <row in value>.
+    """
+
+    def __init__(self, arrays):
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.roots = np.asarray(arrays['roots'])
+        self.max_depth = int(arrays['max_depth'][0])
+        self.classes_ = np.asarray(arrays['classes'])
+        self.n_estimators = len(self.roots)
+
+    def apply(self, X, trees=None):
+        """Row in self.value of the leaf reached, per (tree, row)."""
+        X = np.asarray(X, dtype=np.float32)
+        roots = self.roots if trees is None else self.roots[trees]
+        nodes = np.repeat(roots[:, None], X.shape[0], axis=1)
+        rows = np.broadcast_to(np.arange(X.shape[0]), nodes.shape)
+        for _ in range(self.max_depth):
+            left = self.children_left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+        return -1 - self.children_left[nodes]
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=0)
+
+    def predict_proba_early(self, X, delta, min_trees=16):
+        """
+        Approximate predict_proba that stops adding trees to a row once its
+        top class is settled. Trees are walked in doubling chunks (16, 32,
+        64, ..., all); after each chunk a row stops if the lead of its top
+        class over the runner-up exceeds a Hoeffding-Serfling bound, i.e. the
+        remaining trees can overturn it with probability below `delta`
+        (split evenly over the checks). Returns (proba, trees used per row).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_trees, n_classes = self.n_estimators, self.value.shape[1]
+        if delta <= 0 or n_classes < 2 or min_trees >= n_trees:
+            return self.predict_proba(X), np.full(X.shape[0], n_trees)
+
+        checkpoints = [max(1, min_trees)]
+        while checkpoints[-1] * 2 < n_trees:
+            checkpoints.append(checkpoints[-1] * 2)
+        # Per-tree leads lie in [-1, 1], hence the factor 2 in front of the log
+        log_term = 2.0 * np.log(len(checkpoints) / delta)
+        checkpoints.append(n_trees)
+
+        sums = np.zeros((X.shape[0], n_classes))
+        used = np.zeros(X.shape[0], dtype=np.int32)
+        active = np.arange(X.shape[0])
+        start = 0
+        for stop in checkpoints:
+            sums[active] += self.value[self.apply(X[active], trees=np.arange(start, stop))].sum(axis=0)
+            used[active] = stop
+            start = stop
+            if stop == n_trees:
+                break
+            top2 = np.partition(sums[active] / stop, n_classes - 2, axis=1)[:, -2:]
+            bound = np.sqrt(log_term * (1 - (stop - 1) / n_trees) / stop)
+            active = active[top2[:, 1] - top2[:, 0] < bound]
+            if not active.size:
+                break
+        return sums / used[:, None], used
+
+
+class CompactEncoder:
+    """Multi-hot encoder equivalent to the fitted MultiLabelBinarizer (unknown labels are ignored)."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {str(c): i for i, c in enumerate(self.classes_)}
+
+    def transform(self, symptom_lists):
+        out = np.zeros((len(symptom_lists), len(self.classes_)), dtype=np.int64)
+        for row, symptoms in enumerate(symptom_lists):
+            for symptom in symptoms:
+                col = self._index.get(symptom)
+                if col is not None:
+                    out[row, col] = 1
+        return out
+
+
+def load_model():
+    """Prefer the memory-mapped compact artifact, fall back to the joblib pickles."""
+    if os.path.exists(COMPACT_MODEL_PATH):
+        arrays = load_npz_mmap(COMPACT_MODEL_PATH)
+        return CompactForest(arrays), CompactEncoder(arrays['encoder_classes'])
+    import joblib  # only needed for the pickle fallback
+    return joblib.load('model_forest.pkl'), joblib.load('model_encoder.pkl')
+
+
+# Model artifacts are loaded on first use (or by a warm-up thread), not at import,
+# so workers and non-chat routes start without paying for them
+MODEL = None
+ENCODER = None
+MODEL_LOADED = False
+_LOAD_ATTEMPTED = False
+_LOAD_LOCK = threading.Lock()
+# (MODEL, ENCODER) swapped as one reference, so a prediction never mixes versions
+_CURRENT = (None, None)
+
+
+def _artifact_stat():
+    try:
+        st = os.stat(COMPACT_MODEL_PATH)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _install(model, encoder, stat):
+    global MODEL, ENCODER, MODEL_LOADED, _CURRENT, _ARTIFACT_STAT
+    _CURRENT = (model, encoder)
+    MODEL, ENCODER = model, encoder
     MODEL_LOADED = True
-    print("AI Model loaded successfully.")
-except Exception as e:
-    print(f"AI Model not found: {e}. Run train_model.py first.")
-    MODEL = None
-    ENCODER = None
-    MODEL_LOADED = False
+    _ARTIFACT_STAT = stat
+
+
+def ensure_model_loaded():
+    """Load the model once; returns MODEL_LOADED."""
+    global _LOAD_ATTEMPTED, _ARTIFACT_STAT
+    if _LOAD_ATTEMPTED:
+        return MODEL_LOADED
+    with _LOAD_LOCK:
+        if not _LOAD_ATTEMPTED:
+            # We use try/except so the app doesn't crash if you haven't run train_model.py yet
+            stat = _artifact_stat()
+            try:
+                _install(*load_model(), stat)
+                print("AI Model loaded successfully.")
+            except Exception as e:
+                print(f"AI Model not found: {e}. Run train_model.py first.")
+                # Baseline for maybe_reload_model: a model written later is picked up
+                _ARTIFACT_STAT = stat
+            _LOAD_ATTEMPTED = True
+    return MODEL_LOADED
+
+# =============================================================================
+# HOT RELOAD / BACKGROUND RETRAINING
+# =============================================================================
+
+# Seconds between checks for a new model_forest.npz (0 = never reload)
+MODEL_RELOAD_INTERVAL = float(os.getenv("ML_MODEL_RELOAD_INTERVAL", "2"))
+# Retrain in a child process after ontology edits (insert_disease_entry)
+AUTO_RETRAIN = os.getenv("ML_AUTO_RETRAIN", "1") == "1"
+RETRAIN_COMMAND = [sys.executable, "train_model.py", "--incremental"]
+
+_ARTIFACT_STAT = None
+_NEXT_RELOAD_CHECK = 0.0
+_RELOAD_LOCK = threading.Lock()
+
+
+def maybe_reload_model():
+    """
+    Called on the serving path: at most one os.stat per interval. A changed
+    artifact is loaded on a daemon thread and swapped in when ready, so
+    requests keep using the previous model meanwhile and never wait.
+    Does nothing before ensure_model_loaded() has recorded a baseline stat.
+    """
+    global _NEXT_RELOAD_CHECK
+    now = time.monotonic()
+    if not _LOAD_ATTEMPTED or MODEL_RELOAD_INTERVAL <= 0 or now < _NEXT_RELOAD_CHECK:
+        return
+    _NEXT_RELOAD_CHECK = now + MODEL_RELOAD_INTERVAL
+    stat = _artifact_stat()
+    if stat is None or stat == _ARTIFACT_STAT:
+        return
+    if _RELOAD_LOCK.acquire(blocking=False):
+        threading.Thread(target=_reload, args=(stat,), name="ml-reload", daemon=True).start()
+
+
+def _reload(stat):
+    try:
+        arrays = load_npz_mmap(COMPACT_MODEL_PATH)
+        model = CompactForest(arrays)
+        _install(model, CompactEncoder(arrays['encoder_classes']), stat)
+        print(f"AI Model reloaded ({len(model.classes_)} diseases).")
+    except Exception as e:
+        print("MODEL RELOAD ERROR:", repr(e))
+    finally:
+        _RELOAD_LOCK.release()
+
+
+_RETRAIN_LOCK = threading.Lock()
+_RETRAIN_PENDING = False
+_RETRAIN_THREAD = None
+
+
+def request_retrain():
+    """
+    Ask for train_model.py --incremental in a child process. Requests made
+    while a run is in progress collapse into one follow-up run.
+    """
+    global _RETRAIN_PENDING, _RETRAIN_THREAD
+    if not AUTO_RETRAIN:
+        return
+    with _RETRAIN_LOCK:
+        _RETRAIN_PENDING = True
+        if _RETRAIN_THREAD is None:
+            _RETRAIN_THREAD = threading.Thread(target=_retrain_loop, name="ml-retrain", daemon=True)
+            _RETRAIN_THREAD.start()
+
+
+def _retrain_loop():
+    global _RETRAIN_PENDING, _RETRAIN_THREAD, _NEXT_RELOAD_CHECK
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        with _RETRAIN_LOCK:
+            if not _RETRAIN_PENDING:
+                _RETRAIN_THREAD = None
+                return
+            _RETRAIN_PENDING = False
+        try:
+            result = subprocess.run(RETRAIN_COMMAND, cwd=cwd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print("RETRAIN ERROR:", result.stderr.strip()[-2000:])
+        except Exception as e:
+            print("RETRAIN ERROR:", repr(e))
+        # Check for the new artifact on the next prediction instead of waiting out the interval
+        _NEXT_RELOAD_CHECK = 0.0
+
+
+MIN_CONFIDENCE = 0.05 # Filter out very low probability
+
+# Micro-batching: concurrent requests arriving within this window share one
+# predict_proba call. 0 disables batching and predicts inline.
+BATCH_WINDOW_MS = float(os.getenv("ML_BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "64"))
+
+# Early-exit inference (CompactForest only): stop evaluating trees once the top
+# class can be overturned with probability below this. 0 = always use every tree.
+# See benchmarks/early_exit.py for latency vs agreement at different values.
+EARLY_EXIT_DELTA = float(os.getenv("ML_EARLY_EXIT_DELTA", "0"))
+EARLY_EXIT_MIN_TREES = int(os.getenv("ML_EARLY_EXIT_MIN_TREES", "16"))
+
+
+def predict_batch(symptom_lists, top_n=3):
+    """
+    Takes a list of symptom lists [['fever', 'cough'], ['rash'], ...]
+    Returns one result list per input, same shape as predict_disease_with_ai.
+    All non-empty inputs are encoded and scored in a single vectorized call.
+    """
+    results = [[] for _ in symptom_lists]
+    if not ensure_model_loaded() or top_n <= 0:
+        return results
+    model, encoder = _CURRENT
+
+    rows = [i for i, symptoms in enumerate(symptom_lists) if symptoms]
+    if not rows:
+        return results
+
+    # 1. Transform all inputs to one multi-hot matrix
+    vectors = encoder.transform([symptom_lists[i] for i in rows])
+
+    # 2. Get probabilities for every input at once
+    if EARLY_EXIT_DELTA > 0 and isinstance(model, CompactForest):
+        probs, _ = model.predict_proba_early(vectors, EARLY_EXIT_DELTA, EARLY_EXIT_MIN_TREES)
+    else:
+        probs = model.predict_proba(vectors)
+    classes = model.classes_
+
+    # 3. Top-k per row without sorting every class
+    k = min(top_n, probs.shape[1])
+    top = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(probs, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    # 4. Map to class names
+    for out_row, i in enumerate(rows):
+        results[i] = [
+            {"disease": classes[c], "confidence": float(round(score, 2))}
+            for c, score in zip(top[out_row], top_scores[out_row])
+            if score > MIN_CONFIDENCE
+        ]
+    return results
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single predictions into one predict_batch call.
+    The worker blocks for the first request, then keeps collecting for up to
+    `window` seconds (or `max_size` requests) before scoring them together.
+    """
+
+    def __init__(self, window=BATCH_WINDOW_MS / 1000.0, max_size=BATCH_MAX_SIZE):
+        self.window = window
+        self.max_size = max_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="ml-microbatch", daemon=True)
+                    self._thread.start()
+
+    def submit(self, symptom_list, top_n=3):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((symptom_list, top_n, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                top_n = max(item[1] for item in batch)
+                results = predict_batch([item[0] for item in batch], top_n=top_n)
+                for (_, n, future), result in zip(batch, results):
+                    future.set_result(result[:n])
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+BATCHER = MicroBatcher()
+
 
 def predict_disease_with_ai(symptom_list, top_n=3):
     """
     Takes a list of strings ['fever', 'cough']
     Returns a list of dicts [{'disease': 'Flu', 'confidence': 0.85}, ...]
     """
-    if not MODEL_LOADED or not symptom_list:
+    ensure_model_loaded()
+    maybe_reload_model()
+    if not symptom_list or not MODEL_LOADED:
         return []
 
-    # 1. Transform input to vector (Feature Engineering)
-    # The encoder expects a list of lists, e.g. [['fever', 'cough']]
-    vector = ENCODER.transform([symptom_list])
-
-    # 2. Get probabilities
-    probs = MODEL.predict_proba(vector)[0]
-    
-    # 3. Map probabilities to class names
-    classes = MODEL.classes_
-    
-    # Zip them together
-    results = []
-    for i, disease_name in enumerate(classes):
-        score = probs[i]
-        if score > 0.05: # Filter out very low probability
-            results.append({
-                "disease": disease_name,
-                "confidence": float(round(score, 2))
-            })
-            
-    # 4. Sort by confidence
-    results.sort(key=lambda x: x['confidence'], reverse=True)
-    
-    return results[:top_n]
\ No newline at end of file
+    if BATCH_WINDOW_MS > 0:
+        return BATCHER.submit(symptom_list, top_n)
+    return predict_batch([symptom_list], top_n)[0]
@@ -0,0 +1,153 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from db import get_connection
+
+# =============================================================================
+# SYMPTOM -> DISEASE INDEX
+# =============================================================================
+
+class SymptomIndex:
+    """
+    In-memory inverted index over the disease/symptom ontology.
+
+    Each symptom owns a boolean posting row across all diseases, so scoring a
+    query is one fancy-index + column sum instead of a GROUP_CONCAT join.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]]):
+        by_disease: Dict[str, set] = {}
+        for disease_name, symptom_name in pairs:
+            if disease_name and symptom_name:
+                by_disease.setdefault(disease_name, set()).add(symptom_name)
+
+        self.diseases: List[str] = sorted(by_disease)
+        self.symptoms: List[str] = sorted(set().union(*by_disease.values())) if by_disease else []
+        self._symptom_pos = {name: i for i, name in enumerate(self.symptoms)}
+        self._disease_symptoms = [sorted(by_disease[d]) for d in self.diseases]
+
+        # postings[symptom, disease] == True when the disease lists the symptom
+        self._postings = np.zeros((len(self.symptoms), len(self.diseases)), dtype=bool)
+        for col, disease in enumerate(self.diseases):
+            rows = [self._symptom_pos[s] for s in by_disease[disease]]
+            self._postings[rows, col] = True
+
+    def __len__(self) -> int:
+        return len(self.diseases)
+
+    def match(self, user_symptoms: List[str], top_n: int = 2) -> List[Dict[str, Any]]:
+        """Same result shape as the old SQL matcher: best overlap first."""
+        query = {s for s in user_symptoms if s in self._symptom_pos}
+        if not query or not self.diseases:
+            return []
+
+        rows = [self._symptom_pos[s] for s in query]
+        scores = self._postings[rows].sum(axis=0, dtype=np.int32)
+
+        # Stable sort keeps ties in alphabetical disease order
+        order = np.argsort(-scores, kind="stable")
+        results = []
+        for col in order[:top_n]:
+            score = int(scores[col])
+            if score == 0:
+                break
+            all_symptoms = self._disease_symptoms[col]
+            results.append({
+                "disease": self.diseases[col],
+                "score": score,
+                "matched_symptoms": sorted(query.intersection(all_symptoms)),
+                "all_symptoms": list(all_symptoms),
+            })
+        return results
+
+
+def load_symptom_index() -> SymptomIndex:
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.disease_name, s.symptom_name
+            FROM disease d
+            JOIN disease_symptom ds ON ds.disease_id = d.disease_id
+            JOIN symptom s ON s.symptom_id = ds.symptom_id
+        """)
+        pairs = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return SymptomIndex(pairs)
+
+# =============================================================================
+# DISEASE -> SPECIALTY MAP
+# =============================================================================
+
+def _disease_key(disease_name: str) -> str:
+    # disease_name uses a case-insensitive collation in MySQL; mirror that here
+    return disease_name.strip().lower()
+
+
+def load_specialty_map() -> Dict[str, Optional[str]]:
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.disease_name, s.specialty_name
+            FROM disease d
+            LEFT JOIN specialty s ON d.specialty_id = s.specialty_id
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return {
+        _disease_key(disease): (specialty.strip().upper() if specialty and specialty.strip() else None)
+        for disease, specialty in rows
+        if disease
+    }
+
+# =============================================================================
+# SHARED INSTANCES
+# =============================================================================
+
+_SYMPTOM_INDEX: Optional[SymptomIndex] = None
+_SPECIALTY_MAP: Optional[Dict[str, Optional[str]]] = None
+_LOCK = threading.Lock()
+
+
+def get_symptom_index() -> SymptomIndex:
+    """Load the index on first use; reloads lazily after invalidate()."""
+    global _SYMPTOM_INDEX
+    index = _SYMPTOM_INDEX
+    if index is None:
+        with _LOCK:
+            if _SYMPTOM_INDEX is None:
+                _SYMPTOM_INDEX = load_symptom_index()
+            index = _SYMPTOM_INDEX
+    return index
+
+
+def get_specialty_map() -> Dict[str, Optional[str]]:
+    """Load the disease -> specialty map on first use; reloads lazily after invalidation."""
+    global _SPECIALTY_MAP
+    specialties = _SPECIALTY_MAP
+    if specialties is None:
+        with _LOCK:
+            if _SPECIALTY_MAP is None:
+                _SPECIALTY_MAP = load_specialty_map()
+            specialties = _SPECIALTY_MAP
+    return specialties
+
+
+def get_specialty(disease_name: str) -> Optional[str]:
+    """Specialty for a disease from the preloaded map (no DB round trip once warm)."""
+    return get_specialty_map().get(_disease_key(disease_name))
+
+
+def invalidate() -> None:
+    """Drop all cached ontology data; call after writes to disease/symptom tables."""
+    global _SYMPTOM_INDEX, _SPECIALTY_MAP
+    with _LOCK:
+        _SYMPTOM_INDEX = None
+        _SPECIALTY_MAP = None
@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from db import get_connection
+from dosing import parse_frequency
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+load_dotenv("config/api.env")
+
+# Days of medication one refill is assumed to cover (the schema has no fill size)
+REFILL_DAYS_SUPPLY = float(os.getenv("REFILL_DAYS_SUPPLY", "30"))
+# Prescriptions running out within this many days are reported as shortages
+REFILL_WARNING_DAYS = float(os.getenv("REFILL_WARNING_DAYS", "7"))
+# Refill reminders go out this many days before the stock on hand runs out
+REFILL_REMINDER_LEAD_DAYS = int(os.getenv("REFILL_REMINDER_LEAD_DAYS", "3"))
+REFILL_REMINDER_TIME = datetime.time.fromisoformat(os.getenv("REFILL_REMINDER_TIME", "09:00"))
+# How long one forecast of the whole prescription table is reused
+REFILL_FORECAST_TTL = float(os.getenv("REFILL_FORECAST_TTL", "60"))
+
+# reminder.override_frequency marker for reminders created from the forecast
+REFILL_MARKER = "Refill"
+_IN_LIST_LIMIT = 1000
+_INSERT_BATCH = 2000
+
+# =============================================================================
+# FORECAST
+# =============================================================================
+
+
+def load_prescriptions(conn: Any) -> List[Dict[str, Any]]:
+    """Every prescription with the columns the forecast needs, in one query."""
+    cur = conn.cursor(dictionary=True)
+    cur.execute(
+        """
+        SELECT p.rx_id, p.user_id, p.frequency, p.qty_on_hand, p.refills,
+               d.name AS drug_name
+        FROM prescription p
+        JOIN drug d ON p.drug_id = d.drug_id
+        """
+    )
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+def doses_per_day(frequencies: List[Optional[str]]) -> np.ndarray:
+    """Parse each distinct frequency once and broadcast; NaN where there is no schedule."""
+    unique, inverse = np.unique(np.array([f or "" for f in frequencies], dtype=object), return_inverse=True)
+    rates = np.empty(len(unique))
+    for i, text in enumerate(unique):
+        freq = parse_frequency(text)
+        rates[i] = freq.doses_per_day if freq is not None and not freq.as_needed else np.nan
+    return rates[inverse]
+
+
+def forecast(rows: List[Dict[str, Any]], today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Projected run-out for every prescription in one vectorized pass.
+
+    days_on_hand - days until qty_on_hand is used up
+    days_total   - the same, plus `refills` refills of REFILL_DAYS_SUPPLY days each
+    NaN for as-needed or unreadable frequencies (nothing to project).
+    """
+    today = today or datetime.date.today()
+    n = len(rows)
+    qty = np.fromiter((r["qty_on_hand"] or 0 for r in rows), dtype=float, count=n)
+    refills = np.fromiter((r["refills"] or 0 for r in rows), dtype=float, count=n)
+    rate = doses_per_day([r["frequency"] for r in rows])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_on_hand = np.where(rate > 0, np.maximum(qty, 0) / rate, np.nan)
+    days_total = days_on_hand + np.maximum(refills, 0) * REFILL_DAYS_SUPPLY
+
+    # Row indices per user, so the dashboard can slice one user without a scan
+    users = np.array([r["user_id"] for r in rows], dtype=object)
+    order = np.argsort(users, kind="stable")
+    user_ids, starts = np.unique(users[order], return_index=True)
+    by_user = dict(zip(user_ids, np.split(order, starts[1:])))
+
+    return {
+        "today": today,
+        "rows": rows,
+        "doses_per_day": rate,
+        "days_on_hand": days_on_hand,
+        "days_total": days_total,
+        "refills": refills,
+        "by_user": by_user,
+    }
+
+
+def shortages(fc: Dict[str, Any], user_id: Optional[str] = None,
+              within_days: float = REFILL_WARNING_DAYS) -> List[Dict[str, Any]]:
+    """Prescriptions whose stock on hand runs out within `within_days`, soonest first."""
+    days_on_hand = fc["days_on_hand"]
+    if user_id is None:
+        candidates = np.arange(len(days_on_hand))
+    else:
+        candidates = fc["by_user"].get(user_id, np.empty(0, dtype=np.intp))
+    candidates = candidates[days_on_hand[candidates] <= within_days]  # NaN compares False
+
+    out = []
+    for i in candidates[np.argsort(days_on_hand[candidates], kind="stable")]:
+        row = fc["rows"][i]
+        days_left = int(np.floor(days_on_hand[i]))
+        out.append({
+            "rx_id": row["rx_id"],
+            "user_id": row["user_id"],
+            "drug_name": row["drug_name"],
+            "qty_on_hand": row["qty_on_hand"],
+            "refills": int(fc["refills"][i]),
+            "days_left": days_left,
+            "runout_date": fc["today"] + datetime.timedelta(days=days_left),
+            "final_runout_date": fc["today"] + datetime.timedelta(days=int(np.floor(fc["days_total"][i]))),
+            # No refills left means a new prescription, not a pharmacy trip
+            "action": "refill" if fc["refills"][i] > 0 else "contact doctor",
+        })
+    return out
+
+
+# generation is bumped by invalidate_forecast so a load that raced a write is not kept
+_CACHE: Dict[str, Any] = {"forecast": None, "expires": 0.0, "generation": 0}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_forecast(conn: Any = None) -> Dict[str, Any]:
+    """
+    Whole-table forecast, recomputed at most every REFILL_FORECAST_TTL seconds.
+    The query runs outside the lock; only the swap-in happens under it.
+    """
+    with _CACHE_LOCK:
+        fc = _CACHE["forecast"]
+        if fc is not None and time.monotonic() < _CACHE["expires"] and fc["today"] == datetime.date.today():
+            return fc
+        generation = _CACHE["generation"]
+
+    own_conn = conn is None
+    conn = conn or get_connection()
+    try:
+        rows = load_prescriptions(conn)
+        conn.rollback()
+    finally:
+        if own_conn:
+            conn.close()
+    fc = forecast(rows)
+
+    with _CACHE_LOCK:
+        if _CACHE["generation"] == generation:
+            _CACHE["forecast"] = fc
+            _CACHE["expires"] = time.monotonic() + REFILL_FORECAST_TTL
+    return fc
+
+
+def invalidate_forecast() -> None:
+    """Call after committing a prescription change so the next read reloads."""
+    with _CACHE_LOCK:
+        _CACHE["forecast"] = None
+        _CACHE["generation"] += 1
+
+
+# =============================================================================
+# REMINDERS
+# =============================================================================
+
+
+def create_refill_reminders(conn: Any, items: List[Dict[str, Any]],
+                            lead_days: int = REFILL_REMINDER_LEAD_DAYS) -> List[str]:
+    """
+    Insert one "Refill" reminder per shortage, lead_days before run-out (or
+    today if that has passed). Prescriptions that already have an upcoming
+    refill reminder are skipped. One transaction, multi-row INSERTs.
+    """
+    if not items:
+        return []
+    now = datetime.datetime.now().replace(second=0, microsecond=0)
+    today = now.date()
+    rx_ids = [item["rx_id"] for item in items]
+
+    sql = "SELECT DISTINCT rx_id FROM reminder WHERE override_frequency = %s AND remind_time >= %s"
+    params: List[Any] = [REFILL_MARKER, datetime.datetime.combine(today, datetime.time.min)]
+    # A whole-table run checks every upcoming refill reminder instead of a huge IN list
+    if len(rx_ids) <= _IN_LIST_LIMIT:
+        sql += f" AND rx_id IN ({', '.join(['%s'] * len(rx_ids))})"
+        params += rx_ids
+
+    cur = conn.cursor()
+    try:
+        conn.start_transaction(isolation_level="READ COMMITTED")
+        cur.execute(sql, params)
+        already = {row[0] for row in cur.fetchall()}
+
+        rows, new_ids = [], []
+        for item in items:
+            if item["rx_id"] in already:
+                continue
+            day = max(item["runout_date"] - datetime.timedelta(days=lead_days), today)
+            # Already past today's reminder time: remind now instead
+            remind_time = max(datetime.datetime.combine(day, REFILL_REMINDER_TIME), now)
+            reminder_id = str(uuid.uuid4())
+            new_ids.append(reminder_id)
+            rows.append((reminder_id, item["user_id"], item["rx_id"], remind_time, REFILL_MARKER))
+        for i in range(0, len(rows), _INSERT_BATCH):
+            cur.executemany(
+                """
+                INSERT INTO reminder (reminder_id, user_id, rx_id, remind_time, override_frequency)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                rows[i:i + _INSERT_BATCH],
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return new_ids
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Forecast refill run-out dates for every prescription.")
+    parser.add_argument("--within-days", type=float, default=REFILL_WARNING_DAYS,
+                        help="report prescriptions running out within this many days")
+    parser.add_argument("--create-reminders", action="store_true",
+                        help="also insert Refill reminders for the shortages (e.g. from a daily cron job)")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        started = time.perf_counter()
+        rows = load_prescriptions(conn)
+        conn.rollback()
+        fc = forecast(rows)
+        items = shortages(fc, within_days=args.within_days)
+        print(f"Forecast {len(rows)} prescriptions in {time.perf_counter() - started:.3f}s; "
+              f"{len(items)} run out within {args.within_days:g} days")
+        for item in items[:20]:
+            print(f"  {item['runout_date']}  {item['drug_name']:<30} {item['days_left']:>3}d left  "
+                  f"({item['action']}, user {item['user_id']})")
+
+        if args.create_reminders:
+            created = create_refill_reminders(conn, items)
+            print(f"Created {len(created)} refill reminders")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+import datetime
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dotenv import load_dotenv
+
+import metrics
+from db import get_connection
+
+# =============================================================================
+# CONFIG
+# =============================================================================
+
+load_dotenv("config/api.env")
+
+# Start the dispatcher with the app (keep it to one process: each one fires everything)
+REMINDER_DISPATCH = os.getenv("REMINDER_DISPATCH", "0") == "1"
+# "log" prints deliveries, "file:/path/to/out.jsonl" appends one JSON object per reminder
+REMINDER_SINK = os.getenv("REMINDER_SINK", "log")
+# How far ahead reminders are held in memory
+REMINDER_HORIZON_HOURS = float(os.getenv("REMINDER_HORIZON_HOURS", "24"))
+# Seconds between id-only scans that pick up rows written by other processes / the trigger
+REMINDER_RECONCILE_INTERVAL = float(os.getenv("REMINDER_RECONCILE_INTERVAL", "60"))
+# Reminders that became due at most this many seconds ago are still delivered
+REMINDER_CATCHUP = float(os.getenv("REMINDER_CATCHUP", "300"))
+REMINDER_DEFAULT_TIME_ZONE = os.getenv("REMINDER_DEFAULT_TIME_ZONE", "UTC")
+
+# remind_time is the user's wall clock, so the DB window is padded by the widest
+# UTC offsets (+-14h) plus a full day for reminders pushed to the next window
+_LOOKBACK = datetime.timedelta(days=3)
+_LOOKAHEAD_PAD = datetime.timedelta(days=1)
+_ID_CHUNK = 1000
+
+_ROW_SQL = """
+    SELECT r.reminder_id, r.user_id, r.rx_id, r.remind_time,
+           COALESCE(r.override_frequency, p.frequency) AS frequency,
+           d.name AS drug_name,
+           u.time_zone, u.preferred_window_start, u.preferred_window_end
+    FROM reminder r
+    JOIN prescription p ON r.rx_id = p.rx_id
+    JOIN drug d ON p.drug_id = d.drug_id
+    JOIN user u ON r.user_id = u.user_id
+"""
+
+# =============================================================================
+# SINKS
+# =============================================================================
+
+
+class LogSink:
+    """Prints each delivery; the default, handy in development."""
+
+    def send(self, reminder: Dict[str, Any]) -> None:
+        print(f"REMINDER: {reminder['drug_name']} ({reminder['frequency']}) for user "
+              f"{reminder['user_id']} at {reminder['local_time']}")
+
+
+class FileSink:
+    """Appends one JSON object per delivery to `path` (for tests and load runs)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, reminder: Dict[str, Any]) -> None:
+        line = json.dumps(reminder, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+def make_sink(spec: str) -> Any:
+    """Build a sink from REMINDER_SINK: "log" or "file:<path>"."""
+    if spec == "log":
+        return LogSink()
+    if spec.startswith("file:") and len(spec) > 5:
+        return FileSink(spec[5:])
+    raise ValueError(f"Unknown REMINDER_SINK {spec!r} (expected 'log' or 'file:<path>')")
+
+
+# =============================================================================
+# TIME ZONES AND WINDOWS
+# =============================================================================
+
+
+def _zone(name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or REMINDER_DEFAULT_TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(REMINDER_DEFAULT_TIME_ZONE)
+
+
+def _as_time(value: Any) -> Optional[datetime.time]:
+    """MySQL TIME columns come back as timedelta; accept time and "HH:MM[:SS]" too."""
+    if value is None or isinstance(value, datetime.time):
+        return value
+    if isinstance(value, datetime.timedelta):
+        seconds = int(value.total_seconds()) % 86400
+        return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+    return datetime.time.fromisoformat(str(value))
+
+
+def fire_time(
+    remind_time: datetime.datetime,
+    zone: ZoneInfo,
+    window_start: Optional[datetime.time],
+    window_end: Optional[datetime.time],
+) -> Tuple[datetime.datetime, bool]:
+    """
+    UTC instant a reminder should go out, and whether it was deferred.
+    remind_time is wall-clock time in the user's zone; outside the preferred
+    window it moves to the next window start. Windows may wrap midnight.
+    """
+    local = remind_time.replace(tzinfo=zone)
+    if window_start is None or window_end is None or window_start == window_end:
+        return local.astimezone(datetime.timezone.utc), False
+
+    t = local.time()
+    if window_start < window_end:
+        inside = window_start <= t <= window_end
+        next_day = t > window_end
+    else:
+        inside = t >= window_start or t <= window_end
+        next_day = False
+    if inside:
+        return local.astimezone(datetime.timezone.utc), False
+
+    day = local.date() + datetime.timedelta(days=1 if next_day else 0)
+    deferred = datetime.datetime.combine(day, window_start, tzinfo=zone)
+    return deferred.astimezone(datetime.timezone.utc), True
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+
+class _Pending:
+    __slots__ = ("fire_at", "row", "deferred")
+
+    def __init__(self, fire_at: float, row: Dict[str, Any], deferred: bool):
+        self.fire_at = fire_at
+        self.row = row
+        self.deferred = deferred
+
+
+class ReminderScheduler:
+    """
+    Min-heap of upcoming reminders keyed by UTC fire time, fed from MySQL.
+
+    Cancelling drops the id from `_pending`; its heap entry is skipped when it
+    surfaces (and the heap is rebuilt once stale entries outnumber live ones).
+    New rows arrive through notify_created() from this process and through a
+    periodic id-only reconcile for everything else.
+    """
+
+    def __init__(
+        self,
+        sink: Any,
+        connect: Callable[[], Any] = get_connection,
+        horizon_hours: float = REMINDER_HORIZON_HOURS,
+        reconcile_interval: float = REMINDER_RECONCILE_INTERVAL,
+        catchup: float = REMINDER_CATCHUP,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.sink = sink
+        self.connect = connect
+        self.horizon = datetime.timedelta(hours=horizon_hours)
+        self.reconcile_interval = reconcile_interval
+        self.catchup = catchup
+        self.clock = clock
+
+        self._heap: List[Tuple[float, str]] = []
+        self._pending: Dict[str, _Pending] = {}
+        # Delivered, skipped or deleted ids still inside the DB window (not re-added by reconcile)
+        self._done: Set[str] = set()
+        self._created: Set[str] = set()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._next_reconcile = 0.0
+        self.delivered = 0
+        self.failed = 0
+        self.skipped = 0
+
+    # -------------------------------------------------------------------------
+    # Heap maintenance
+    # -------------------------------------------------------------------------
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Schedule one reminder row (see _ROW_SQL); False if it is already past catch-up."""
+        fire_at, deferred = fire_time(
+            row["remind_time"],
+            _zone(row.get("time_zone")),
+            _as_time(row.get("preferred_window_start")),
+            _as_time(row.get("preferred_window_end")),
+        )
+        ts = fire_at.timestamp()
+        rid = row["reminder_id"]
+        with self._cond:
+            if ts < self.clock() - self.catchup:
+                self._pending.pop(rid, None)
+                self._done.add(rid)
+                self.skipped += 1
+                return False
+            self._pending[rid] = _Pending(ts, row, deferred)
+            heapq.heappush(self._heap, (ts, rid))
+            if self._heap[0][1] == rid:
+                self._cond.notify()
+        return True
+
+    def add_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for row in rows if self.add(row))
+
+    def cancel(self, reminder_id: str) -> bool:
+        with self._cond:
+            self._done.add(reminder_id)
+            if self._pending.pop(reminder_id, None) is None:
+                return False
+            if len(self._heap) > 2 * len(self._pending) + 1024:
+                self._compact()
+        return True
+
+    def _compact(self) -> None:
+        self._heap = [(ts, rid) for ts, rid in self._heap
+                      if rid in self._pending and self._pending[rid].fire_at == ts]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> List[_Pending]:
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                ts, rid = heapq.heappop(self._heap)
+                entry = self._pending.get(rid)
+                if entry is None or entry.fire_at != ts:
+                    continue  # cancelled or rescheduled
+                del self._pending[rid]
+                self._done.add(rid)
+                due.append(entry)
+        return due
+
+    def _next_due(self) -> Optional[float]:
+        while self._heap:
+            ts, rid = self._heap[0]
+            entry = self._pending.get(rid)
+            if entry is not None and entry.fire_at == ts:
+                return ts
+            heapq.heappop(self._heap)
+        return None
+
+    # -------------------------------------------------------------------------
+    # Delivery
+    # -------------------------------------------------------------------------
+
+    def dispatch_due(self, now: Optional[float] = None) -> int:
+        """Send everything due by `now`; returns how many went out."""
+        sent = 0
+        for entry in self._pop_due(self.clock() if now is None else now):
+            row = entry.row
+            reminder = {
+                "reminder_id": row["reminder_id"],
+                "user_id": row["user_id"],
+                "rx_id": row["rx_id"],
+                "drug_name": row.get("drug_name"),
+                "frequency": row.get("frequency"),
+                "local_time": row["remind_time"].isoformat(sep=" "),
+                "time_zone": row.get("time_zone"),
+                "fire_at": datetime.datetime.fromtimestamp(entry.fire_at, datetime.timezone.utc).isoformat(),
+                "deferred": entry.deferred,
+            }
+            try:
+                self.sink.send(reminder)
+                self.delivered += 1
+                sent += 1
+                metrics.inc("medibuddy_reminders_total", status="delivered")
+            except Exception as e:
+                self.failed += 1
+                metrics.inc("medibuddy_reminders_total", status="failed")
+                print("REMINDER SINK ERROR:", repr(e))
+        return sent
+
+    # -------------------------------------------------------------------------
+    # Loading from MySQL
+    # -------------------------------------------------------------------------
+
+    def _db_window(self) -> Tuple[datetime.datetime, datetime.datetime]:
+        now = datetime.datetime.fromtimestamp(self.clock(), datetime.timezone.utc).replace(tzinfo=None)
+        return now - _LOOKBACK, now + self.horizon + _LOOKAHEAD_PAD
+
+    def _fetch_rows(self, conn: Any, ids: List[str]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        cur = conn.cursor(dictionary=True)
+        for i in range(0, len(ids), _ID_CHUNK):
+            chunk = ids[i:i + _ID_CHUNK]
+            cur.execute(_ROW_SQL + f" WHERE r.reminder_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            rows.extend(cur.fetchall())
+        cur.close()
+        return rows
+
+    def load(self) -> int:
+        """Initial fill: every reminder in the DB window, in one range query."""
+        lo, hi = self._db_window()
+        conn = self.connect()
+        try:
+            cur = conn.cursor(dictionary=True)
+            cur.execute(_ROW_SQL + " WHERE r.remind_time >= %s AND r.remind_time < %s", (lo, hi))
+            rows = cur.fetchall()
+            cur.close()
+            conn.rollback()
+        finally:
+            conn.close()
+        self._next_reconcile = time.monotonic() + self.reconcile_interval
+        return self.add_many(rows)
+
+    def reconcile(self) -> Tuple[int, int]:
+        """
+        Diff the ids in the DB window against what is held in memory: schedule
+        the unknown ones, cancel the ones that disappeared. Only ids are read
+        for the whole window; full rows are fetched just for the new ones.
+        """
+        lo, hi = self._db_window()
+        conn = self.connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT reminder_id FROM reminder WHERE remind_time >= %s AND remind_time < %s", (lo, hi))
+            current = {row[0] for row in cur.fetchall()}
+            cur.close()
+
+            with self._cond:
+                gone = [rid for rid in self._pending if rid not in current]
+                self._done &= current
+                new = [rid for rid in current if rid not in self._pending and rid not in self._done]
+                self._created -= current
+            for rid in gone:
+                self.cancel(rid)
+            rows = self._fetch_rows(conn, new) if new else []
+            conn.rollback()
+        finally:
+            conn.close()
+        self._next_reconcile = time.monotonic() + self.reconcile_interval
+        return self.add_many(rows), len(gone)
+
+    def _load_created(self) -> None:
+        with self._cond:
+            ids = [rid for rid in self._created if rid not in self._pending and rid not in self._done]
+            self._created.clear()
+        if not ids:
+            return
+        conn = self.connect()
+        try:
+            rows = self._fetch_rows(conn, ids)
+            conn.rollback()
+        finally:
+            conn.close()
+        self.add_many(rows)
+
+    # -------------------------------------------------------------------------
+    # Incremental updates from the app
+    # -------------------------------------------------------------------------
+
+    def notify_created(self, reminder_id: str) -> None:
+        """Queue a freshly inserted reminder; the dispatch thread loads it."""
+        with self._cond:
+            self._created.add(reminder_id)
+            self._cond.notify()
+
+    def notify_deleted(self, reminder_id: str) -> None:
+        self.cancel(reminder_id)
+
+    # -------------------------------------------------------------------------
+    # Thread
+    # -------------------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="reminder-dispatch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print("REMINDER LOAD ERROR:", repr(e))
+            self._next_reconcile = time.monotonic() + self.reconcile_interval
+
+        while not self._stopping:
+            try:
+                if time.monotonic() >= self._next_reconcile:
+                    self.reconcile()
+                elif self._created:
+                    self._load_created()
+            except Exception as e:
+                print("REMINDER RECONCILE ERROR:", repr(e))
+                self._next_reconcile = time.monotonic() + self.reconcile_interval
+
+            self.dispatch_due()
+
+            with self._cond:
+                if self._stopping or self._created:
+                    continue
+                wait = self._next_reconcile - time.monotonic()
+                next_due = self._next_due()
+                if next_due is not None:
+                    wait = min(wait, next_due - self.clock())
+                if wait > 0:
+                    self._cond.wait(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+            next_due = self._next_due()
+        return {
+            "pending": pending,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "next_due_in_seconds": round(next_due - self.clock(), 3) if next_due is not None else -1,
+        }
+
+
+# =============================================================================
+# PROCESS-WIDE DISPATCHER
+# =============================================================================
+
+_SCHEDULER: Optional[ReminderScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def start(sink: Any = None) -> ReminderScheduler:
+    """Start the process-wide dispatcher (idempotent)."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = ReminderScheduler(sink or make_sink(REMINDER_SINK))
+            _SCHEDULER.start()
+    return _SCHEDULER
+
+
+def get_scheduler() -> Optional[ReminderScheduler]:
+    return _SCHEDULER
+
+
+def notify_created(reminder_id: str) -> None:
+    if _SCHEDULER is not None:
+        _SCHEDULER.notify_created(reminder_id)
+
+
+def notify_deleted(reminder_id: str) -> None:
+    if _SCHEDULER is not None:
+        _SCHEDULER.notify_deleted(reminder_id)
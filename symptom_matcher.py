@@ -0,0 +1,234 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# =============================================================================
+# VOCABULARY
+# =============================================================================
+
+# Everyday phrasings -> canonical symptom names (must exist in SYMPTOMS)
+SYNONYMS: Dict[str, str] = {
+    "diarrhea": "diarrhoea",
+    "loose motions": "diarrhoea",
+    "throwing up": "vomiting",
+    "throw up": "vomiting",
+    "vomit": "vomiting",
+    "puking": "vomiting",
+    "tired": "fatigue",
+    "tiredness": "fatigue",
+    "exhausted": "fatigue",
+    "exhaustion": "fatigue",
+    "dizzy": "dizziness",
+    "lightheaded": "dizziness",
+    "itchy": "itching",
+    "itchiness": "itching",
+    "rash": "skin_rash",
+    "short of breath": "breathlessness",
+    "shortness of breath": "breathlessness",
+    "out of breath": "breathlessness",
+    "stomach ache": "stomach_pain",
+    "stomachache": "stomach_pain",
+    "tummy ache": "stomach_pain",
+    "sore joints": "joint_pain",
+    "aching joints": "joint_pain",
+    "sore muscles": "muscle_pain",
+    "muscle ache": "muscle_pain",
+    "muscle aches": "muscle_pain",
+    "body aches": "muscle_pain",
+    "stuffy nose": "congestion",
+    "blocked nose": "congestion",
+    "sneezing": "continuous_sneezing",
+    "coughing": "cough",
+    "chest tightness": "chest_pain",
+    "heart racing": "fast_heart_rate",
+    "racing heart": "fast_heart_rate",
+    "sweaty": "sweating",
+    "chilly": "chills",
+    "anxious": "anxiety",
+    "depressed": "depression",
+    "constipated": "constipation",
+    "nauseous": "nausea",
+    "nauseated": "nausea",
+    "yellow eyes": "yellowing_of_eyes",
+    "yellow skin": "yellowish_skin",
+    "red eyes": "redness_of_eyes",
+    "watery eyes": "watering_from_eyes",
+    "blurry vision": "blurred_and_distorted_vision",
+    "blurred vision": "blurred_and_distorted_vision",
+    "frequent urination": "polyuria",
+    "burning urination": "burning_micturition",
+    "painful urination": "burning_micturition",
+}
+
+# Filler words that don't count against coverage
+STOPWORDS = frozenset("""
+    a an the and or but so with without also too very really quite bit little lot
+    i im i'm ive i've me my mine we our you
+    have has had having been be am is are was were feel feeling feels felt get got getting
+    some since for from of in on at to it its this that these those
+    day days week weeks today yesterday night morning lately recently now all
+    bad terrible severe constant kind sort like just
+""".split())
+
+# Any of these in the input means a phrase match may be negated; leave it to the LLM
+NEGATIONS = frozenset({"no", "not", "never", "dont", "don't", "didnt", "didn't", "without", "nor"})
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def phrase_forms(symptom: str) -> List[str]:
+    """'foul_smell_of urine' -> ['foul smell of urine'], 'toxic_look_(typhos)' -> ['toxic look typhos', 'toxic look']"""
+    base = " ".join(tokenize(symptom.replace("_", " ")))
+    forms = [base]
+    without_parens = " ".join(tokenize(re.sub(r"\(.*?\)", " ", symptom.replace("_", " "))))
+    if without_parens and without_parens != base:
+        forms.append(without_parens)
+    return forms
+
+# =============================================================================
+# TRIE MATCHER
+# =============================================================================
+
+_END = "$"
+
+
+class SymptomMatcher:
+    """
+    Token-level trie over symptom phrases and synonyms.
+    Scans left to right taking the longest phrase at each position, so
+    'high fever' wins over any shorter overlapping phrase.
+    """
+
+    def __init__(self, symptoms: Iterable[str], synonyms: Optional[Dict[str, str]] = None):
+        self._root: Dict[str, dict] = {}
+        vocabulary = set(symptoms)
+        for symptom in sorted(vocabulary):
+            for form in phrase_forms(symptom):
+                self._add(form.split(), symptom)
+        for phrase, symptom in (synonyms or {}).items():
+            if symptom in vocabulary:
+                self._add(tokenize(phrase), symptom)
+
+    def _add(self, tokens: List[str], symptom: str) -> None:
+        if not tokens:
+            return
+        node = self._root
+        for tok in tokens:
+            node = node.setdefault(tok, {})
+        node.setdefault(_END, symptom)
+
+    def match(self, text: str) -> Tuple[List[str], float, bool]:
+        """
+        Returns (symptoms, coverage, negated).
+        coverage = share of non-filler tokens that fell inside a matched phrase.
+        """
+        tokens = tokenize(text)
+        found: List[str] = []
+        covered = [False] * len(tokens)
+
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best_end, best_symptom = -1, None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    best_end, best_symptom = j, node[_END]
+            if best_symptom is None:
+                i += 1
+                continue
+            if best_symptom not in found:
+                found.append(best_symptom)
+            for k in range(i, best_end):
+                covered[k] = True
+            i = best_end
+
+        content = [k for k, tok in enumerate(tokens) if tok not in STOPWORDS]
+        if content:
+            coverage = sum(1 for k in content if covered[k]) / len(content)
+        else:
+            coverage = 0.0
+        negated = any(tok in NEGATIONS for tok in tokens)
+        return found, coverage, negated
+
+# =============================================================================
+# FUZZY PREFILTER (for the LLM prompt)
+# =============================================================================
+
+def _trigrams(token: str) -> frozenset:
+    padded = f"#{token}#"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class SymptomPrefilter:
+    """
+    Cheap fuzzy pre-selection of the symptoms a message might be about, so the
+    extraction prompt only lists plausible candidates. Words are compared by
+    character-trigram Dice similarity, which tolerates plurals, typos and
+    partial words ('head' ~ 'headache', 'vomitting' ~ 'vomiting').
+    """
+
+    def __init__(self, symptoms: Iterable[str], synonyms: Optional[Dict[str, str]] = None,
+                 min_similarity: float = 0.5):
+        self.min_similarity = min_similarity
+        # symptom -> word lists of its phrase forms and synonyms
+        self._forms: Dict[str, List[List[str]]] = {}
+        vocabulary = set(symptoms)
+        for symptom in sorted(vocabulary):
+            self._forms[symptom] = [self._content(form) for form in phrase_forms(symptom)]
+        for phrase, symptom in (synonyms or {}).items():
+            if symptom in vocabulary:
+                self._forms[symptom].append(self._content(phrase))
+
+        words = {w for forms in self._forms.values() for form in forms for w in form}
+        self._grams = {w: _trigrams(w) for w in words}
+        self._by_gram: Dict[str, List[str]] = {}
+        for word, grams in self._grams.items():
+            for gram in grams:
+                self._by_gram.setdefault(gram, []).append(word)
+
+    @staticmethod
+    def _content(text: str) -> List[str]:
+        return [tok for tok in tokenize(text) if tok not in STOPWORDS and len(tok) > 2]
+
+    def _similar_words(self, token: str) -> Dict[str, float]:
+        grams = _trigrams(token)
+        shared = Counter(w for gram in grams for w in self._by_gram.get(gram, ()))
+        out = {}
+        for word, n in shared.items():
+            dice = 2 * n / (len(grams) + len(self._grams[word]))
+            if dice >= self.min_similarity:
+                out[word] = dice
+        return out
+
+    def candidates(self, text: str, limit: int) -> Tuple[List[str], float]:
+        """
+        Returns (symptoms, coverage): up to `limit` symptoms ranked by fuzzy
+        word overlap with `text`, and the share of the message's content words
+        that resembled any vocabulary word. Low coverage means the message uses
+        words we can't map locally and the candidate list may miss symptoms.
+        """
+        tokens = set(self._content(text))
+        best: Dict[str, float] = {}
+        recognized = 0
+        for token in tokens:
+            similar = self._similar_words(token)
+            recognized += bool(similar)
+            for word, sim in similar.items():
+                if sim > best.get(word, 0.0):
+                    best[word] = sim
+        coverage = recognized / len(tokens) if tokens else 0.0
+
+        scored = []
+        for symptom, forms in self._forms.items():
+            score = max(sum(best.get(w, 0.0) for w in form) for form in forms)
+            if score > 0:
+                scored.append((-score, symptom))
+        scored.sort()
+        return [symptom for _, symptom in scored[:limit]], coverage
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+# No background threads from importing app.py under test
+os.environ["WARMUP_ON_START"] = "0"
+os.environ["REMINDER_DISPATCH"] = "0"
@@ -0,0 +1,62 @@
+import datetime
+
+import pytest
+
+from dosing import BEDTIME, EVENING, MORNING, expand_schedule, parse_frequency
+
+
+def clock(value):
+    return datetime.time.fromisoformat(value)
+
+
+@pytest.mark.parametrize("text,times", [
+    ("once daily at bedtime", (BEDTIME,)),
+    ("Once daily in the morning", (MORNING,)),
+    ("daily with dinner", (EVENING,)),
+    ("twice daily morning and evening", (MORNING, EVENING)),
+    ("before bed", (BEDTIME,)),
+])
+def test_time_of_day_wins_over_default_slot(text, times):
+    freq = parse_frequency(text)
+    assert freq.times == tuple(clock(t) for t in times)
+    assert freq.doses_per_day == len(times)
+
+
+def test_time_of_day_keeps_interval_in_days():
+    freq = parse_frequency("every other day at bedtime")
+    assert freq.times == (clock(BEDTIME),)
+    assert freq.every_days == 2
+
+
+def test_time_of_day_ignored_when_count_disagrees():
+    # Three doses cannot all go in the evening; keep the default spread
+    assert len(parse_frequency("three times daily, last dose in the evening").times) == 3
+
+
+@pytest.mark.parametrize("text,per_day", [
+    ("bid", 2),
+    ("BID with meals", 2),
+    ("1 tab PO TID after food", 3),
+    ("qid", 4),
+    ("QD in the morning", 1),
+    ("q6h with food", 4),
+])
+def test_latin_abbreviations_inside_longer_text(text, per_day):
+    freq = parse_frequency(text)
+    assert freq is not None
+    assert freq.doses_per_day == per_day
+
+
+def test_prn_is_as_needed_not_scheduled():
+    freq = parse_frequency("tid prn")
+    assert freq.as_needed
+    assert expand_schedule(freq, datetime.date(2026, 1, 1), 7) == []
+
+
+def test_bedtime_schedule_expands_at_bedtime():
+    doses = expand_schedule(parse_frequency("once daily at bedtime"), datetime.date(2026, 1, 1), 2)
+    assert doses == [datetime.datetime(2026, 1, 1, 22, 0), datetime.datetime(2026, 1, 2, 22, 0)]
+
+
+def test_unreadable_text_is_none():
+    assert parse_frequency("see label") is None
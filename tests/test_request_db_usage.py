@@ -0,0 +1,129 @@
+"""
+One pooled connection per request, and the demo-user lookup only until the
+session remembers the id (app.get_db / get_current_user_id / close_db).
+"""
+import pytest
+
+import app as app_module
+
+
+class FakeCursor:
+    def __init__(self, conn, dictionary=False):
+        self.conn = conn
+        self.dictionary = dictionary
+        self.last_sql = ""
+
+    def execute(self, sql, params=None):
+        self.last_sql = " ".join(sql.split())
+        self.conn.statements.append(self.last_sql)
+
+    def fetchone(self):
+        if self.last_sql.startswith("SELECT user_id FROM user"):
+            return ("user-1",)
+        if "COUNT(*) AS total_prescriptions" in self.last_sql:
+            return {"user_id": "user-1", "total_prescriptions": 1}
+        if self.last_sql.startswith("SELECT u.user_id, d.drug_id"):
+            return {"user_id": "user-1", "drug_id": "drug-1"}
+        return None
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.statements = pool.statements
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self, dictionary)
+
+    def start_transaction(self, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.pool.closed += 1
+
+
+class FakePool:
+    def __init__(self):
+        self.connects = 0
+        self.closed = 0
+        self.statements = []
+
+    def get_connection(self):
+        self.connects += 1
+        return FakeConnection(self)
+
+    def reset(self):
+        self.connects = 0
+        self.closed = 0
+        self.statements.clear()
+
+    def user_lookups(self):
+        return sum(1 for sql in self.statements if sql.startswith("SELECT user_id FROM user"))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool()
+    # app.py imported get_connection by name, so patch both references
+    monkeypatch.setattr("db.get_connection", fake.get_connection)
+    monkeypatch.setattr(app_module, "get_connection", fake.get_connection)
+    return fake
+
+
+@pytest.fixture
+def client():
+    app_module.app.config["TESTING"] = True
+    with app_module.app.test_client() as c:
+        yield c
+
+
+# (method, path, form, statements once the user id is known)
+ROUTES = [
+    ("get", "/prescriptions", None, 2),
+    ("post", "/prescriptions/create", {"drug_id": "drug-1", "frequency": "Once daily",
+                                        "qty_on_hand": "30", "refills": "1"}, 3),
+    ("get", "/reminders", None, 2),
+    ("post", "/reminders/create", {"rx_id": "rx-1", "remind_date": "2026-01-05", "remind_time": "09:00"}, 1),
+]
+
+
+@pytest.mark.parametrize("method,path,form,queries", ROUTES)
+def test_one_checkout_per_request(pool, client, method, path, form, queries):
+    response = getattr(client, method)(path, data=form)
+    assert response.status_code in (200, 302)
+    assert pool.connects == 1
+    assert pool.closed == 1
+    assert pool.user_lookups() == 1
+    assert len(pool.statements) == queries + 1
+
+    # Second request in the same session: the user id comes from the cookie
+    pool.reset()
+    response = getattr(client, method)(path, data=form)
+    assert response.status_code in (200, 302)
+    assert pool.connects == 1
+    assert pool.closed == 1
+    assert pool.user_lookups() == 0
+    assert len(pool.statements) == queries
+
+
+def test_session_user_skips_lookup_across_routes(pool, client):
+    with client.session_transaction() as sess:
+        sess["user_id"] = "user-1"
+    for method, path, form, queries in ROUTES:
+        pool.reset()
+        assert getattr(client, method)(path, data=form).status_code in (200, 302)
+        assert pool.connects == 1, path
+        assert pool.user_lookups() == 0, path
+        assert len(pool.statements) == queries, path
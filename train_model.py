@@ -1,21 +1,33 @@
+import argparse
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+import zlib
 import mysql.connector
 import pandas as pd
 import numpy as np
 import joblib
-import random
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, runs are not serialized
+    fcntl = None
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import MultiLabelBinarizer
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 
-# Reuse your config
-MYSQL_CONFIG = {
-    "host": "localhost",
-    "port": 3306,
-    "user": "root",
-    "password": "[PASSWORD]",
-    "database": "[DATABASE_NAME]",
-}
+# Compact, mmap-friendly copy of the forest read by ml_service.CompactForest
+COMPACT_MODEL_PATH = 'model_forest.npz'
+# Per-disease synthetic samples kept between runs so --incremental only
+# regenerates diseases whose symptom list changed
+SAMPLE_CACHE_PATH = 'model_samples.joblib'
+# Held for a whole run so retrains started by several app workers take turns
+TRAIN_LOCK_PATH = 'model_forest.lock'
+
+# Reuse the app's config (db.py reads it from config/api.env)
+from db import MYSQL_CONFIG
 
 def get_db_data():
     """Fetch the 'Ground Truth' from SQL: Which disease has which symptoms?"""
@@ -37,57 +49,199 @@ def get_db_data():
     
     return disease_map, all_symptoms
 
-def generate_synthetic_data(disease_map, all_symptoms, samples_per_disease=50):
+def disease_fingerprint(symptoms, samples_per_disease, seed):
+    """Changes whenever anything that shapes a disease's samples changes."""
+    raw = "\x00".join([str(seed), str(samples_per_disease)] + sorted(set(symptoms)))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def generate_disease_samples(disease, disease_symptoms, symptoms, samples_per_disease, seed):
     """
-    Generates synthetic patient data.
-    For each disease, create 'samples_per_disease' fake records.
+    Synthetic records for one disease as a multi-hot block over `symptoms`.
+    The generator is seeded from (seed, disease), so a disease's block does
+    not depend on which other diseases exist.
     """
-    data = []
-    labels = []
-
-    print(f"Generating synthetic data for {len(disease_map)} diseases...")
-
-    for disease, true_symptoms in disease_map.items():
-        for _ in range(samples_per_disease):
-            # Start with the true symptoms
-            patient_symptoms = true_symptoms.copy()
-            
-            # 1. DROP SAMPLES (Simulate patient forgetting a symptom)
-            # 20% chance to drop a symptom if they have more than 2
-            if len(patient_symptoms) > 2 and random.random() < 0.2:
-                patient_symptoms.remove(random.choice(patient_symptoms))
-
-            # 2. ADD NOISE (Simulate patient having a random unrelated headache)
-            # 10% chance to add a random symptom not associated with this disease
-            if random.random() < 0.1:
-                noise = random.choice(all_symptoms)
-                if noise not in patient_symptoms:
-                    patient_symptoms.append(noise)
-            
-            data.append(patient_symptoms)
-            labels.append(disease)
-
-    return data, labels
-
-def train():
-    # 1. Get Rules from DB
-    disease_map, all_symptoms = get_db_data()
+    rng = np.random.default_rng([seed, zlib.crc32(disease.encode("utf-8"))])
+    col = {name: j for j, name in enumerate(symptoms)}
+    n = samples_per_disease
+
+    X = np.zeros((n, len(symptoms)), dtype=np.uint8)
+    X[:, [col[s] for s in disease_symptoms]] = 1
+
+    # 1. DROP SAMPLES (Simulate patient forgetting a symptom)
+    # 20% chance to drop a symptom if they have more than 2
+    drop = (X.sum(axis=1) > 2) & (rng.random(n) < 0.2)
+    if drop.any():
+        # Random key per present symptom; argmax picks one of them uniformly
+        keys = rng.random((int(drop.sum()), len(symptoms))) * X[drop]
+        X[np.flatnonzero(drop), keys.argmax(axis=1)] = 0
+
+    # 2. ADD NOISE (Simulate patient having a random unrelated headache)
+    # 10% chance to add a random symptom (no-op if they already have it)
+    noisy = rng.random(n) < 0.1
+    X[np.flatnonzero(noisy), rng.integers(0, len(symptoms), int(noisy.sum()))] = 1
+    return X
+
+def generate_synthetic_data(disease_map, all_symptoms, samples_per_disease=50, seed=42, cache=None):
+    """
+    Generates synthetic patient data straight into a multi-hot matrix.
+    For each disease, create 'samples_per_disease' fake records; the same
+    seed always yields the same dataset.
+
+    With `cache` (a dict, see load_sample_cache) blocks of diseases whose
+    fingerprint is unchanged are reused and only new or edited diseases are
+    generated; the cache is updated in place.
 
-    # 2. Generate Data
-    X_raw, y = generate_synthetic_data(disease_map, all_symptoms, samples_per_disease=100)
+    Returns (X, labels, symptoms): X[i, j] == 1 when record i has symptoms[j].
+    """
+    diseases = sorted(disease_map)
+    symptoms = sorted(set(all_symptoms).union(*disease_map.values()))
+    col = {name: j for j, name in enumerate(symptoms)}
+    cache = {} if cache is None else cache
+
+    blocks, generated = [], 0
+    for disease in diseases:
+        fingerprint = disease_fingerprint(disease_map[disease], samples_per_disease, seed)
+        entry = cache.get(disease)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            block = generate_disease_samples(disease, disease_map[disease], symptoms, samples_per_disease, seed)
+            # Store only the columns in use, by name, so blocks survive vocabulary changes
+            used = np.flatnonzero(block.any(axis=0))
+            entry = cache[disease] = {
+                "fingerprint": fingerprint,
+                "columns": [symptoms[j] for j in used],
+                "samples": block[:, used],
+            }
+            generated += 1
+        block = np.zeros((entry["samples"].shape[0], len(symptoms)), dtype=np.uint8)
+        block[:, [col[name] for name in entry["columns"]]] = entry["samples"]
+        blocks.append(block)
+
+    for stale in set(cache) - set(diseases):
+        del cache[stale]
+
+    print(f"Synthetic data: {generated} of {len(diseases)} diseases generated, {len(diseases) - generated} reused")
+    X = np.concatenate(blocks) if blocks else np.zeros((0, len(symptoms)), dtype=np.uint8)
+    labels = np.repeat(np.array(diseases), [b.shape[0] for b in blocks])
+    return X, labels, symptoms
+
+def load_sample_cache(path=SAMPLE_CACHE_PATH):
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return {}
 
-    # 3. Feature Engineering (Multi-Hot Encoding)
-    # Converts ['fever', 'cough'] into [1, 0, 1, 0...]
-    mlb = MultiLabelBinarizer()
-    X = mlb.fit_transform(X_raw)
+def _replace_atomically(path, write):
+    """
+    write(fh) into a uniquely named temp file next to `path`, then rename it
+    over `path`, so readers never see a half-written file and concurrent
+    writers never share a temp file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fh = tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False)
+    try:
+        with fh:
+            write(fh)
+        os.replace(fh.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(fh.name)
+        raise
+
+@contextlib.contextmanager
+def training_lock(path=TRAIN_LOCK_PATH):
+    """Exclusive flock on `path` for the duration of a training run."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
 
-    # 4. Train/Test Split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def save_sample_cache(cache, path=SAMPLE_CACHE_PATH):
+    _replace_atomically(path, lambda fh: joblib.dump(cache, fh))
 
-    # 5. Model Training
-    print("Training Random Forest Classifier...")
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
+def export_compact_model(clf, mlb, path=COMPACT_MODEL_PATH):
+    """
+    Flatten every tree of the forest into shared node arrays and save them
+    uncompressed (np.savez), so workers can memory-map the file instead of
+    unpickling 100 sklearn tree objects.
+    Child indices are rewritten to point into the flattened arrays. Only
+    leaves keep class distributions: a leaf stores -1 - <row in value> in
+    children_left, so internal nodes cost no value storage.
+    """
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    leaf_offset = 0
+    max_depth = 0
+    for est in clf.estimators_:
+        tree = est.tree_
+        is_leaf = tree.children_left < 0
+        leaf_rows = leaf_offset + np.cumsum(is_leaf) - 1
+        lefts.append(np.where(is_leaf, -1 - leaf_rows, tree.children_left + offset))
+        rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        # Leaf class probabilities, exactly what DecisionTree.predict_proba returns
+        value = tree.value[is_leaf, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values.append(value / totals)
+        roots.append(offset)
+        offset += tree.node_count
+        leaf_offset += int(is_leaf.sum())
+        max_depth = max(max_depth, tree.max_depth)
+
+    # Write next to the target and rename, so serving workers never map a half-written file
+    arrays = dict(
+        children_left=np.concatenate(lefts).astype(np.int32),
+        children_right=np.concatenate(rights).astype(np.int32),
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=np.array([max_depth], dtype=np.int32),
+        classes=np.array([str(c) for c in clf.classes_]),
+        encoder_classes=np.array([str(c) for c in mlb.classes_]),
+    )
+    _replace_atomically(path, lambda fh: np.savez(fh, **arrays))
+
+def build_dataset(disease_map, all_symptoms, samples_per_disease=100, seed=42, test_size=0.2, cache=None):
+    """Synthetic data + fitted encoder + train/test split, all reproducible from `seed`."""
+    X, y, symptoms = generate_synthetic_data(disease_map, all_symptoms, samples_per_disease, seed=seed, cache=cache)
+
+    # Feature Engineering (Multi-Hot Encoding) is already done; fit the encoder
+    # on the same column order so the app can turn ['fever', 'cough'] into rows
+    mlb = MultiLabelBinarizer(classes=symptoms)
+    mlb.fit([])
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+    return X_train, X_test, y_train, y_test, mlb
+
+def train(samples_per_disease=100, n_estimators=100, n_jobs=-1, seed=42):
+    with training_lock():
+        _train(samples_per_disease, n_estimators, n_jobs, seed)
+
+def _train(samples_per_disease, n_estimators, n_jobs, seed):
+    # 1. Get Rules from DB
+    disease_map, all_symptoms = get_db_data()
+
+    # 2. Generate Data, 3. Encode, 4. Train/Test Split
+    start = time.perf_counter()
+    cache = {}
+    X_train, X_test, y_train, y_test, mlb = build_dataset(
+        disease_map, all_symptoms, samples_per_disease=samples_per_disease, seed=seed, cache=cache
+    )
+    print(f"Generated {len(X_train) + len(X_test)} records in {time.perf_counter() - start:.2f}s")
+
+    # 5. Model Training (n_jobs=-1 builds trees on every core; random_state keeps it reproducible)
+    print(f"Training Random Forest Classifier ({n_estimators} trees)...")
+    start = time.perf_counter()
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=n_jobs)
     clf.fit(X_train, y_train)
+    print(f"Trained in {time.perf_counter() - start:.2f}s")
 
     # 6. Evaluation
     print("Model Evaluation:")
@@ -97,7 +251,69 @@ def train():
     print("Saving model and encoder...")
     joblib.dump(clf, 'model_forest.pkl')
     joblib.dump(mlb, 'model_encoder.pkl')
+    export_compact_model(clf, mlb)
+    save_sample_cache(cache)
     print("Done! You now have an AI model.")
 
+def retrain_incremental(samples_per_disease=100, n_estimators=100, n_jobs=-1, seed=42):
+    """
+    Refit after ontology edits, reusing the cached samples of unchanged diseases.
+    Skips the fit entirely when nothing changed since the last run. Writes only
+    model_forest.npz, which running workers pick up without a restart
+    (ml_service.maybe_reload_model). Returns True when a new model was written.
+    Runs hold training_lock(), so one started by another worker waits and then
+    usually finds nothing left to do.
+    """
+    with training_lock():
+        return _retrain_incremental(samples_per_disease, n_estimators, n_jobs, seed)
+
+def _retrain_incremental(samples_per_disease, n_estimators, n_jobs, seed):
+    disease_map, all_symptoms = get_db_data()
+    cache = load_sample_cache()
+
+    changed = sorted(
+        d for d in disease_map
+        if d not in cache or cache[d]["fingerprint"] != disease_fingerprint(disease_map[d], samples_per_disease, seed)
+    )
+    removed = sorted(set(cache) - set(disease_map))
+    if not changed and not removed and os.path.exists(COMPACT_MODEL_PATH):
+        print("Ontology unchanged since the last training run; nothing to do.")
+        return False
+    print(f"Ontology delta: {len(changed)} new/changed, {len(removed)} removed disease(s)")
+
+    start = time.perf_counter()
+    X, y, symptoms = generate_synthetic_data(disease_map, all_symptoms, samples_per_disease, seed=seed, cache=cache)
+    mlb = MultiLabelBinarizer(classes=symptoms)
+    mlb.fit([])
+
+    # Serving model: fit on every record, there is no held-out evaluation here
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=n_jobs)
+    clf.fit(X, y)
+    export_compact_model(clf, mlb)
+    save_sample_cache(cache)
+    print(f"Incremental retrain done in {time.perf_counter() - start:.2f}s")
+    return True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the MediBuddy symptom -> disease model.")
+    parser.add_argument("--samples-per-disease", type=int, default=100,
+                        help="synthetic patient records generated per disease (default: 100)")
+    parser.add_argument("--n-estimators", type=int, default=100,
+                        help="number of trees in the forest (default: 100)")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="parallel jobs for fitting, -1 = all cores (default: -1)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="seed for data generation, split and forest (default: 42)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only regenerate samples for changed diseases and refresh model_forest.npz")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    args = parse_args()
+    run = retrain_incremental if args.incremental else train
+    run(
+        samples_per_disease=args.samples_per_disease,
+        n_estimators=args.n_estimators,
+        n_jobs=args.n_jobs,
+        seed=args.seed,
+    )
\ No newline at end of file